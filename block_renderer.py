@@ -0,0 +1,253 @@
+import hashlib
+import re
+from collections import OrderedDict
+
+from math_renderer import cache_variant
+from render_engine import render_markdown
+
+# Blocks of the current document are always kept; this many blocks that
+# dropped out of it (for example after an undo-able edit) are kept as well.
+SPARE_CACHE_SIZE = 512
+
+FENCE_OPEN_RE = re.compile(r'^(`{3,}|~{3,})')
+LIST_ITEM_RE = re.compile(r'^ {0,3}(?:[*+-]|\d+[.)])[ \t]')
+BLOCKQUOTE_RE = re.compile(r'^ {0,3}>')
+# Raw HTML starts a block where Python-Markdown's HTML extractor starts
+# one: a comment, processing instruction, CDATA section or block-level tag
+# at the start of a line.
+HTML_BLOCK_RE = re.compile(r'^ {0,3}<(!--|\?|!\[CDATA\[|[a-zA-Z][a-zA-Z0-9]*)')
+HTML_END_MARKERS = {"!--": "-->", "?": "?>", "![CDATA[": "]]>"}
+# md.block_level_elements of Python-Markdown, listed here so that splitting
+# the source does not need markdown imported.
+BLOCK_LEVEL_ELEMENTS = frozenset([
+    'address', 'article', 'aside', 'blockquote', 'details', 'div', 'dl', 'fieldset', 'figcaption', 'figure',
+    'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hgroup', 'hr', 'main', 'menu', 'nav', 'ol',
+    'p', 'pre', 'section', 'table', 'ul', 'canvas', 'colgroup', 'dd', 'body', 'dt', 'group', 'html', 'iframe',
+    'li', 'legend', 'math', 'map', 'noscript', 'output', 'object', 'option', 'progress', 'script', 'style',
+    'summary', 'tbody', 'td', 'textarea', 'tfoot', 'th', 'thead', 'tr', 'video', 'center',
+])
+VOID_ELEMENTS = frozenset(['hr'])
+# Reference links ([id]: url) and abbreviations (*[HTML]: ...) can be used
+# from any block, so every block is rendered with them in scope.
+DEFINITION_RE = re.compile(r'^ {0,3}(?:\[[^\]^][^\]]*\]|\*\[[^\]]+\]):')
+# Footnote numbering and [TOC] depend on the whole document, so documents
+# using them are rendered in one piece.
+FOOTNOTE_RE = re.compile(r'\[\^[^\]]+\]')
+TOC_MARKER_RE = re.compile(r'^[ \t]*\[TOC\][ \t]*$', re.MULTILINE)
+# Heading ids as written by the toc extension, which only sees one block.
+HEADING_ID_RE = re.compile(r'(<h[1-6]\b[^>]*?\bid=")([^"]*)(")')
+ID_COUNT_RE = re.compile(r'^(.*)_([0-9]+)$')
+
+
+class IncrementalRenderer:
+    def __init__(self, render=render_markdown, spare_cache_size=SPARE_CACHE_SIZE):
+        self.render_block = render
+        self.spare_cache_size = spare_cache_size
+        self.cache = OrderedDict()
+        self.rendered_count = 0
+
+    def render(self, text):
+        lines = text.split('\n')
+        chunks, definitions = scan_chunks(lines)
+        full_render = FOOTNOTE_RE.search(text) or TOC_MARKER_RE.search(text)
+        if full_render:
+            spans = [(0, len(lines) - 1)]
+            context = ""
+        else:
+            spans = merge_chunks(lines, chunks)
+            context = "\n".join(definitions)
+
+        context_digest = hashlib.sha1(context.encode("utf-8")).hexdigest()
+        previous = self.cache
+        self.cache = OrderedDict()
+        self.rendered_count = 0
+        blocks = []
+        for start, end in spans:
+            source = "\n".join(lines[start:end + 1])
+            blocks.append((start,) + self.cached_render(previous, source, context, context_digest))
+
+        for _ in range(min(len(previous), self.spare_cache_size)):
+            key, rendered = previous.popitem()
+            self.cache.setdefault(key, rendered)
+            self.cache.move_to_end(key, last=False)
+        if full_render:
+            return [(start, html) for start, html, _ in blocks]
+        return unique_heading_ids(blocks)
+
+    def cached_render(self, previous, source, context, context_digest):
+        key = hashlib.sha1((context_digest + "\0" + cache_variant(source) + "\0" + source).encode("utf-8")).digest()
+        rendered = self.cache.get(key)
+        if rendered is None:
+            rendered = previous.pop(key, None)
+        if rendered is None:
+            html = self.render_block(source + "\n\n" + context if context else source)
+            rendered = (html, tuple(match.group(2) for match in HEADING_ID_RE.finditer(html)))
+            self.rendered_count += 1
+        self.cache[key] = rendered
+        return rendered
+
+    def clear(self):
+        self.cache.clear()
+
+
+def join_blocks(blocks):
+    return "\n".join(html for _, html in blocks)
+
+
+def unique_id(heading_id, used):
+    # Same numbering as the toc extension: title, title_1, title_2, ...
+    while heading_id in used or not heading_id:
+        match = ID_COUNT_RE.match(heading_id)
+        if match:
+            heading_id = "%s_%d" % (match.group(1), int(match.group(2)) + 1)
+        else:
+            heading_id = "%s_1" % heading_id
+    used.add(heading_id)
+    return heading_id
+
+
+def unique_heading_ids(blocks):
+    # Blocks are rendered (and cached) on their own, so two blocks can give
+    # their headings the same id. One pass in document order numbers them
+    # as a whole-document render would; only blocks with a repeated heading
+    # are rewritten.
+    used = set()
+    result = []
+    for start, html, ids in blocks:
+        if ids:
+            new_ids = [unique_id(heading_id, used) for heading_id in ids]
+            if new_ids != list(ids):
+                replacements = iter(new_ids)
+                html = HEADING_ID_RE.sub(lambda match: match.group(1) + next(replacements) + match.group(3), html)
+        result.append((start, html))
+    return result
+
+
+def scan_chunks(lines):
+    # Splits the source into blank-line separated chunks, never breaking a
+    # fenced code block, and collects document-wide definitions on the way.
+    chunks = []
+    definitions = []
+    start = None
+    fence = None
+
+    for number, line in enumerate(lines):
+        if fence is None:
+            if not line.strip():
+                if start is not None:
+                    chunks.append((start, number - 1))
+                    start = None
+                continue
+            match = FENCE_OPEN_RE.match(line)
+            if match:
+                fence = match.group(1)
+            elif DEFINITION_RE.match(line):
+                definitions.append(line)
+        elif line.rstrip() == fence:
+            fence = None
+        if start is None:
+            start = number
+
+    if start is not None:
+        chunks.append((start, len(lines) - 1))
+    return chunks, definitions
+
+
+def merge_chunks(lines, chunks):
+    # Joins chunks that Markdown would treat as one element: indented
+    # continuations, loose lists, consecutive blockquotes, definition lists
+    # and raw HTML blocks containing blank lines. Merging is always safe,
+    # splitting is not, so anything ambiguous stays together.
+    spans = []
+    html_block = None
+    for start, end in chunks:
+        first_line = lines[start]
+        if spans and (html_block or continues_block(lines[spans[-1][0]], first_line)):
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+            html_block = open_html_block(first_line)
+        if html_block and html_block.closes("\n".join(lines[start:end + 1])):
+            html_block = None
+    return spans
+
+
+class HtmlBlock:
+    # Raw HTML that runs until its closing marker, or until the tag it
+    # starts with is closed again (tags of the same name nest).
+    def __init__(self, end_marker=None, tag=None):
+        self.end_marker = end_marker
+        self.depth = 0
+        if tag:
+            self.open_re = re.compile(r'<%s\b(?![^>]*/>)' % tag, re.IGNORECASE)
+            self.close_re = re.compile(r'</%s\s*>' % tag, re.IGNORECASE)
+        self.first = True
+
+    def closes(self, text):
+        if self.end_marker:
+            # The end marker cannot be part of the opening one.
+            if self.first:
+                text = text[text.index("<") + 1:]
+            self.first = False
+            return self.end_marker in text
+        self.depth += len(self.open_re.findall(text)) - len(self.close_re.findall(text))
+        return self.depth <= 0
+
+
+def open_html_block(line):
+    match = HTML_BLOCK_RE.match(line)
+    if not match:
+        return None
+    start = match.group(1)
+    if start in HTML_END_MARKERS:
+        return HtmlBlock(end_marker=HTML_END_MARKERS[start])
+    tag = start.lower()
+    if tag not in BLOCK_LEVEL_ELEMENTS or tag in VOID_ELEMENTS:
+        return None
+    return HtmlBlock(tag=tag)
+
+
+def continues_block(previous_first_line, first_line):
+    if first_line[:1] in (" ", "\t", ":"):
+        return True
+    if LIST_ITEM_RE.match(first_line) and LIST_ITEM_RE.match(previous_first_line):
+        return True
+    if BLOCKQUOTE_RE.match(first_line) and BLOCKQUOTE_RE.match(previous_first_line):
+        return True
+    return False
+
+
+# Sources whose blocks once rendered differently on their own than as part
+# of the whole document.
+REGRESSION_SAMPLES = [
+    "para\n\n<!-- a comment\n\nstill the comment -->\n\nafter\n",
+    "<script>\nvar a = 1;\n\nvar b = 2;\n</script>\n\nafter\n",
+    "<style>\np { color: red; }\n\nh1 { color: blue; }\n</style>\n\n# Head\n",
+    "<div>\n<div>\ninner\n\n</div>\n\nouter\n</div>\n\nafter\n",
+    "<iframe src=\"x\">\n\n</iframe>\n\n<noscript>\n\nno script\n\n</noscript>\n\nafter\n",
+    "<?php echo 1;\n\n?>\n\n<hr>\n\nafter\n",
+    "# Intro\n\nx\n\nIntro\n=====\n\n## Intro!\n\n# Intro_1\n",
+]
+
+
+def differs_from_full_render(text):
+    # Blank lines between blocks are the only difference allowed.
+    def normalize(html):
+        return re.sub(r'>\n+<', '>\n<', html)
+    return normalize(join_blocks(IncrementalRenderer().render(text))) != normalize(render_markdown(text))
+
+
+if __name__ == "__main__":
+    # python3 block_renderer.py [file.md ...]
+    import sys
+    samples = REGRESSION_SAMPLES
+    if len(sys.argv) > 1:
+        samples = []
+        for path in sys.argv[1:]:
+            with open(path, "r", encoding="utf-8") as f:
+                samples.append(f.read())
+    failures = [text for text in samples if differs_from_full_render(text)]
+    for text in failures:
+        print(f"differs from a full render: {text[:60]!r}")
+    print(f"{len(samples) - len(failures)}/{len(samples)} match a full render")
+    sys.exit(1 if failures else 0)
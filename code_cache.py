@@ -0,0 +1,82 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from markdown.extensions import codehilite, fenced_code
+
+# Highlighted HTML kept across renders, bounded by size rather than count
+# since one long listing can outweigh hundreds of short snippets.
+MAX_CACHE_BYTES = 8 * 1024 * 1024
+
+
+class CodeBlockCache:
+    # Shared by every Markdown instance in the process; the render threads
+    # and the export worker use it concurrently.
+    def __init__(self, max_bytes=MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            html = self.entries.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def put(self, key, html):
+        cost = len(html)
+        if cost > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.entries[key] = html
+            self.size += cost
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries), "bytes": self.size}
+
+
+cache = CodeBlockCache()
+
+
+class CachedCodeHilite(codehilite.CodeHilite):
+    def hilite(self, shebang=True):
+        # The formatter options carry the Pygments style, so a theme that
+        # switches styles gets its own entries.
+        options = repr(sorted(self.options.items(), key=lambda item: item[0]))
+        digest = hashlib.sha1(self.src.encode("utf-8", "surrogatepass")).digest()
+        key = (self.lang, shebang, self.guess_lang, self.use_pygments, self.lang_prefix, str(self.pygments_formatter), options, digest)
+        html = cache.get(key)
+        if html is None:
+            html = super().hilite(shebang)
+            cache.put(key, html)
+        return html
+
+
+def install():
+    # fenced_code and codehilite look CodeHilite up as a module global when
+    # they run, so swapping it there covers fenced and indented code alike.
+    fenced_code.CodeHilite = CachedCodeHilite
+    codehilite.CodeHilite = CachedCodeHilite
+
+
+def stats():
+    return cache.stats()
@@ -1,4 +1,4 @@
-from PyQt5.QtWidgets import QDialog, QFormLayout, QSpinBox, QDialogButtonBox, QHBoxLayout, QLineEdit, QPushButton
+from PyQt5.QtWidgets import QDialog, QFormLayout, QSpinBox, QDialogButtonBox, QHBoxLayout, QLineEdit, QPushButton, QCheckBox, QLabel
 from PyQt5.QtGui import QIcon
 from translations import translations
 
@@ -46,6 +46,18 @@ class FindReplaceDialog(QDialog):
         layout.addRow(translations[self.current_dialog_language]["find_label"], self.find_input)
         layout.addRow(translations[self.current_dialog_language]["replace_label"], self.replace_input)
 
+        options_layout = QHBoxLayout()
+        self.case_checkbox = QCheckBox(translations[self.current_dialog_language]["match_case"])
+        self.whole_word_checkbox = QCheckBox(translations[self.current_dialog_language]["whole_words"])
+        self.regex_checkbox = QCheckBox(translations[self.current_dialog_language]["use_regex"])
+        options_layout.addWidget(self.case_checkbox)
+        options_layout.addWidget(self.whole_word_checkbox)
+        options_layout.addWidget(self.regex_checkbox)
+        layout.addRow("", options_layout)
+
+        self.match_count_label = QLabel("")
+        layout.addRow("", self.match_count_label)
+
         find_buttons_layout = QHBoxLayout()
         self.find_next_button = QPushButton(translations[self.current_dialog_language]["find_next"])
         self.find_prev_button = QPushButton(translations[self.current_dialog_language]["find_prev"])
@@ -69,3 +81,30 @@ class FindReplaceDialog(QDialog):
         self.find_prev_button.setText(translations[new_language]["find_prev"])
         self.replace_button.setText(translations[new_language]["replace_button"])
         self.replace_all_button.setText(translations[new_language]["replace_all_button"])
+        self.case_checkbox.setText(translations[new_language]["match_case"])
+        self.whole_word_checkbox.setText(translations[new_language]["whole_words"])
+        self.regex_checkbox.setText(translations[new_language]["use_regex"])
+
+# --- ExportOptionsDialog Class ---
+class ExportOptionsDialog(QDialog):
+    def __init__(self, parent=None, current_language="en"):
+        super().__init__(parent)
+        self.setWindowTitle(translations[current_language]["export_html"])
+        self.setWindowIcon(QIcon("icons/halwanmark.png"))
+
+        self.minify_checkbox = QCheckBox(translations[current_language]["minify_html"])
+        self.embed_images_checkbox = QCheckBox(translations[current_language]["embed_images"])
+
+        layout = QFormLayout()
+        layout.addRow(self.minify_checkbox)
+        layout.addRow(self.embed_images_checkbox)
+
+        self.buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel, self)
+        self.buttons.accepted.connect(self.accept)
+        self.buttons.rejected.connect(self.reject)
+
+        layout.addWidget(self.buttons)
+        self.setLayout(layout)
+
+    def get_options(self):
+        return self.minify_checkbox.isChecked(), self.embed_images_checkbox.isChecked()
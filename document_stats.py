@@ -0,0 +1,55 @@
+def astral_count(text):
+    # Characters outside the BMP, which Qt counts twice (UTF-16).
+    return len(text.encode("utf-16-le", "surrogatepass")) // 2 - len(text)
+
+
+class DocumentStats:
+    # Word counts are kept per text block (one block per line in the
+    # editor), so an edit only recounts the blocks it touched. The same goes
+    # for characters outside the BMP, so the character count is in code
+    # points rather than Qt's UTF-16 units.
+    def __init__(self, document):
+        self.document = document
+        self.recount()
+        document.contentsChange.connect(self.on_contents_change)
+
+    def recount(self):
+        self.block_words = []
+        self.block_astral = []
+        block = self.document.begin()
+        while block.isValid():
+            text = block.text()
+            self.block_words.append(len(text.split()))
+            self.block_astral.append(astral_count(text))
+            block = block.next()
+        self.words = sum(self.block_words)
+        self.astral = sum(self.block_astral)
+
+    @property
+    def chars(self):
+        return self.document.characterCount() - 1 - self.astral
+
+    def on_contents_change(self, position, removed, added):
+        document = self.document
+        first = document.findBlock(position).blockNumber()
+        last_position = min(position + added, document.characterCount() - 1)
+        last = document.findBlock(last_position).blockNumber()
+        # Blocks first..old_last of the previous text became first..last.
+        old_last = last - (document.blockCount() - len(self.block_words))
+        if first < 0 or old_last < first or old_last >= len(self.block_words):
+            self.recount()
+            return
+
+        counts = []
+        astral = []
+        block = document.findBlockByNumber(first)
+        for _ in range(last - first + 1):
+            text = block.text()
+            counts.append(len(text.split()))
+            astral.append(astral_count(text))
+            block = block.next()
+
+        self.words += sum(counts) - sum(self.block_words[first:old_last + 1])
+        self.block_words[first:old_last + 1] = counts
+        self.astral += sum(astral) - sum(self.block_astral[first:old_last + 1])
+        self.block_astral[first:old_last + 1] = astral
@@ -1,23 +1,37 @@
 import sys
 import os
-import re
 
 from PyQt5.QtGui import QFont, QIcon, QTextCursor, QTextDocument, QKeySequence, QDesktopServices
 from PyQt5.QtWidgets import (
-	QMainWindow, QWidget, QVBoxLayout, QTextEdit, QTextBrowser,
+	QMainWindow, QWidget, QVBoxLayout, QPlainTextEdit,
 	QSplitter, QAction, QMessageBox,
-	QToolBar, QMenu, QTabWidget, QLabel, QShortcut, QFileDialog, QDialog, QDialogButtonBox
+	QToolBar, QMenu, QTabWidget, QLabel, QShortcut, QFileDialog, QDialog, QDialogButtonBox,
+	QProgressBar, QPushButton
 )
-from PyQt5.QtCore import Qt, QUrl
+from PyQt5.QtCore import Qt, QUrl, QTimer
 
-import markdown
+import startup_profile
 from translations import translations
-from dialogs import TableCreationDialog
+from dialogs import TableCreationDialog, ExportOptionsDialog
 from utils import generate_markdown_table
 from file_manager import FileManager
 from format_actions import FormatActions
 from theme_manager import ThemeManager
 from search_replace import SearchReplace
+from find_in_files import FindInFiles
+from outline_panel import Outline
+from render_scheduler import RenderScheduler
+from preview_patcher import PreviewPatcher
+from preview_browser import PreviewBrowser
+from scroll_sync import ScrollSync
+from markdown_highlighter import MarkdownHighlighter
+from document_stats import DocumentStats
+from file_loader import FileLoader
+from file_saver import FileSaver
+from export_worker import ExportWorker
+from image_loader import ImageLoader
+from recovery_journal import RecoveryJournal
+from session_manager import SessionManager
 
 class MarkdownEditor(QMainWindow):
 	def __init__(self):
@@ -27,13 +41,27 @@ class MarkdownEditor(QMainWindow):
 		self.setWindowIcon(QIcon("icons/halwanmark.png"))
 		self.find_replace_dialog = None
 		self.current_theme_stylesheet = ""
+		# (setter, translation key) for every label change_language updates.
+		self.translated_labels = []
 
 		self.file_manager = FileManager(self)
 		self.format_actions = FormatActions(self)
 		self.theme_manager = ThemeManager(self)
 		self.search_replace = SearchReplace(self)
+		self.find_in_files = FindInFiles(self)
+		self.outline = Outline(self)
+		self.render_scheduler = RenderScheduler(self)
+		self.scroll_sync = ScrollSync(self)
+		self.file_loader = FileLoader(self)
+		self.file_saver = FileSaver(self)
+		self.export_worker = ExportWorker(self)
+		self.image_loader = ImageLoader(self)
+		self.recovery_journal = RecoveryJournal(self)
+		self.session_manager = SessionManager(self)
+		startup_profile.mark("helpers created")
 
 		self.init_ui()
+		startup_profile.mark("window built")
 
 	def init_ui(self):
 		self.tab_widget = QTabWidget()
@@ -43,10 +71,28 @@ class MarkdownEditor(QMainWindow):
 		self.setCentralWidget(self.tab_widget)
 
 		self.statusBar_message = self.statusBar()
-		self.word_count_label = self.statusBar_message.addPermanentWidget(QLabel(""))
-		self.char_count_label = self.statusBar_message.addPermanentWidget(QLabel(""))
-
+		self.word_count_label = QLabel("")
+		self.char_count_label = QLabel("")
+		self.statusBar_message.addPermanentWidget(self.word_count_label)
+		self.statusBar_message.addPermanentWidget(self.char_count_label)
+
+		self.load_progress = QProgressBar()
+		self.load_progress.setMaximumWidth(200)
+		self.load_progress.setTextVisible(False)
+		self.load_cancel_button = QPushButton()
+		self.translate_label(self.load_cancel_button.setText, "cancel")
+		self.load_cancel_button.clicked.connect(self.file_loader.cancel_current)
+		self.statusBar_message.addPermanentWidget(self.load_progress)
+		self.statusBar_message.addPermanentWidget(self.load_cancel_button)
+		self.hide_load_progress()
+
+		# Connected first, so the other handlers see the tab built.
+		self.tab_widget.currentChanged.connect(self.session_manager.materialize_current)
 		self.tab_widget.currentChanged.connect(self.update_status_bar_for_current_tab)
+		self.tab_widget.currentChanged.connect(lambda: self.render_scheduler.refresh_if_stale(self.get_current_container_widget()))
+		self.tab_widget.currentChanged.connect(lambda: self.theme_manager.restyle_if_stale(self.get_current_container_widget()))
+		self.tab_widget.currentChanged.connect(lambda: self.search_replace.refresh_index(quiet=True))
+		self.tab_widget.currentChanged.connect(self.outline.refresh)
 
 		self.create_toolbar()
 		self.theme_manager.light_theme()
@@ -54,24 +100,53 @@ class MarkdownEditor(QMainWindow):
 		self.setWindowTitle(translations[self.current_language]["app_title"])
 		self.create_shortcuts()
 
-		self.file_manager.new_file()
+		if not self.session_manager.restore():
+			self.file_manager.new_file()
+		startup_profile.mark("tabs opened")
+		QTimer.singleShot(0, self.render_scheduler.warm_up)
+		QTimer.singleShot(0, self.recovery_journal.offer_recovery)
 		
 	def add_new_tab(self, editor_text="", file_path=None):
 		container_widget = QWidget()
+		container_widget.current_file = file_path
+		container_widget.is_modified = False
+		self.build_tab(container_widget, editor_text)
+
+		tab_title = translations[self.current_language]["untitled_file"]
+		if file_path:
+			tab_title = os.path.basename(file_path)
+
+		tab_index = self.tab_widget.addTab(container_widget, tab_title)
+		self.tab_widget.setCurrentIndex(tab_index)
+		self.file_manager.set_tab_modified(container_widget, False)
+
+		self.update_counts(container_widget.stats.words, container_widget.stats.chars)
+		# An empty tab already shows the right (empty) preview.
+		if editor_text:
+			self.render_scheduler.render_now(container_widget)
+
+	def build_tab(self, container_widget, editor_text=""):
+		# Fills in a tab's editor and preview. Tabs restored from the last
+		# session start out as bare placeholders and are built on first view.
 		main_layout = QVBoxLayout(container_widget)
 		main_layout.setContentsMargins(0, 0, 0, 0)
 
-		editor = QTextEdit()
+		# QPlainTextEdit relayouts only the blocks that change; QTextEdit walks
+		# the whole document for every restyled block.
+		editor = QPlainTextEdit()
 		editor.setLayoutDirection(Qt.RightToLeft)
 		editor.setFont(QFont("Courier", 12))
-		editor.textChanged.connect(self.update_preview_and_counts)
+		editor.setPlainText(editor_text)
+		highlighter = MarkdownHighlighter(editor, self.theme_manager.is_dark_theme)
+		editor.textChanged.connect(lambda container=container_widget: self.update_preview_and_counts(container))
 		editor.textChanged.connect(lambda editor=editor: self.file_manager.set_tab_modified_by_editor(editor, True))
 
-		preview = QTextBrowser()
+		preview = PreviewBrowser(container_widget, self.image_loader)
 		preview.setLayoutDirection(Qt.RightToLeft)
 		preview.setReadOnly(True)
 		preview.setFont(QFont("Arial", 12))
 		preview.setOpenExternalLinks(True)
+		self.theme_manager.apply_preview_stylesheet(preview)
 		
 		splitter = QSplitter(Qt.Horizontal)
 		splitter.addWidget(editor)
@@ -82,20 +157,14 @@ class MarkdownEditor(QMainWindow):
 
 		container_widget.editor = editor
 		container_widget.preview = preview
-		container_widget.current_file = file_path
-		container_widget.is_modified = False
-
-		tab_title = translations[self.current_language]["untitled_file"]
-		if file_path:
-			tab_title = os.path.basename(file_path)
-		
-		editor.setPlainText(editor_text)
-
-		tab_index = self.tab_widget.addTab(container_widget, tab_title)
-		self.tab_widget.setCurrentIndex(tab_index)
-		self.file_manager.set_tab_modified_by_editor(editor, False)
-
-		self.update_preview_and_counts()
+		container_widget.highlighter = highlighter
+		container_widget.preview_patcher = PreviewPatcher(preview)
+		container_widget.preview_blocks = []
+		container_widget.stats = DocumentStats(editor.document())
+		self.render_scheduler.attach(container_widget)
+		self.scroll_sync.attach(container_widget)
+		self.outline.attach(container_widget)
+		self.recovery_journal.attach(container_widget)
 
 	def get_current_container_widget(self):
 		return self.tab_widget.currentWidget()
@@ -112,21 +181,22 @@ class MarkdownEditor(QMainWindow):
 		container = self.get_current_container_widget()
 		return container.current_file if container and hasattr(container, 'current_file') else None
 
-	def set_current_file(self, file_path):
-		container = self.get_current_container_widget()
+	def set_current_file(self, file_path, container=None):
+		container = container or self.get_current_container_widget()
 		if container:
 			container.current_file = file_path
 			tab_index = self.tab_widget.indexOf(container)
 			tab_title = os.path.basename(file_path) if file_path else translations[self.current_language]["untitled_file"]
+			if container.is_modified:
+				tab_title += "*"
 			self.tab_widget.setTabText(tab_index, tab_title)
-			self.file_manager.set_tab_modified_by_editor(container.editor, False)
 
 	def update_status_bar_for_current_tab(self):
-		current_editor = self.get_current_editor()
-		if current_editor:
-			self.update_counts(current_editor.toPlainText())
+		container = self.get_current_container_widget()
+		if container and hasattr(container, 'stats'):
+			self.update_counts(container.stats.words, container.stats.chars)
 		else:
-			self.update_counts("")
+			self.update_counts(0, 0)
 
 	def create_shortcuts(self):
 		QShortcut(QKeySequence("Ctrl+N"), self, self.file_manager.new_file)
@@ -143,126 +213,112 @@ class MarkdownEditor(QMainWindow):
 		QShortcut(QKeySequence("Ctrl+Shift+`"), self, lambda: self.format_actions.insert_text_at_cursor("```\n\n```"))
 		QShortcut(QKeySequence("Ctrl+T"), self, self.insert_table_dialog)
 		QShortcut(QKeySequence("Ctrl+F"), self, self.search_replace.show_find_replace_dialog)
+		QShortcut(QKeySequence("Ctrl+Shift+F"), self, self.find_in_files.show_panel)
+		QShortcut(QKeySequence("Ctrl+Shift+O"), self, self.outline.show_panel)
 
 	def create_toolbar(self):
-		if not hasattr(self, 'toolbar'):
-			self.toolbar = QToolBar("Tools")
-			self.addToolBar(self.toolbar)
-		else:
-			self.toolbar.clear()
-
-		new_action = QAction(translations[self.current_language]["new"], self)
-		new_action.triggered.connect(self.file_manager.new_file)
-		self.toolbar.addAction(new_action)
+		# Built once; change_language relabels the registered widgets in place.
+		self.toolbar = QToolBar("Tools")
+		self.addToolBar(self.toolbar)
 
-		open_action = QAction(translations[self.current_language]["open"], self)
-		open_action.triggered.connect(self.file_manager.open_file)
-		self.toolbar.addAction(open_action)
-
-		save_action = QAction(translations[self.current_language]["save"], self)
-		save_action.triggered.connect(self.file_manager.save_file)
-		self.toolbar.addAction(save_action)
-
-		save_as_action = QAction(translations[self.current_language]["save_as"], self)
-		save_as_action.triggered.connect(self.file_manager.save_file_as)
-		self.toolbar.addAction(save_as_action)
+		self.add_toolbar_action("new", self.file_manager.new_file)
+		self.add_toolbar_action("open", self.file_manager.open_file)
+		self.add_toolbar_action("save", self.file_manager.save_file)
+		self.add_toolbar_action("save_as", self.file_manager.save_file_as)
 
 		self.toolbar.addSeparator()
 
-		undo_action = QAction(translations[self.current_language]["undo"], self)
-		undo_action.triggered.connect(self.format_actions.undo)
-		self.toolbar.addAction(undo_action)
-
-		redo_action = QAction(translations[self.current_language]["redo"], self)
-		redo_action.triggered.connect(self.format_actions.redo)
-		self.toolbar.addAction(redo_action)
+		self.add_toolbar_action("undo", self.format_actions.undo)
+		self.add_toolbar_action("redo", self.format_actions.redo)
 
 		self.toolbar.addSeparator()
 
-		format_menu = QMenu(translations[self.current_language]["format"], self)
-		format_menu.addAction(translations[self.current_language]["heading1"], lambda: self.format_actions.insert_text_at_cursor("# "))
-		format_menu.addAction(translations[self.current_language]["heading2"], lambda: self.format_actions.insert_text_at_cursor("## "))
-		format_menu.addAction(translations[self.current_language]["heading3"], lambda: self.format_actions.insert_text_at_cursor("### "))
+		format_menu = self.add_toolbar_menu("format")
+		self.add_menu_action(format_menu, "heading1", lambda: self.format_actions.insert_text_at_cursor("# "))
+		self.add_menu_action(format_menu, "heading2", lambda: self.format_actions.insert_text_at_cursor("## "))
+		self.add_menu_action(format_menu, "heading3", lambda: self.format_actions.insert_text_at_cursor("### "))
 		format_menu.addSeparator()
-		format_menu.addAction(translations[self.current_language]["bold"], lambda: self.format_actions.insert_wrapped_text("**", "**"))
-		format_menu.addAction(translations[self.current_language]["italic"], lambda: self.format_actions.insert_wrapped_text("*", "*"))
-		format_menu.addAction(translations[self.current_language]["strikethrough"], lambda: self.format_actions.insert_wrapped_text("~~", "~~"))
+		self.add_menu_action(format_menu, "bold", lambda: self.format_actions.insert_wrapped_text("**", "**"))
+		self.add_menu_action(format_menu, "italic", lambda: self.format_actions.insert_wrapped_text("*", "*"))
+		self.add_menu_action(format_menu, "strikethrough", lambda: self.format_actions.insert_wrapped_text("~~", "~~"))
 		format_menu.addSeparator()
-		format_menu.addAction(translations[self.current_language]["bullet_list"], lambda: self.format_actions.insert_text_at_cursor("- "))
-		format_menu.addAction(translations[self.current_language]["numbered_list"], lambda: self.format_actions.insert_text_at_cursor("1. "))
-		format_menu.addAction(translations[self.current_language]["task_list"], lambda: self.format_actions.insert_text_at_cursor("- [ ] "))
+		self.add_menu_action(format_menu, "bullet_list", lambda: self.format_actions.insert_text_at_cursor("- "))
+		self.add_menu_action(format_menu, "numbered_list", lambda: self.format_actions.insert_text_at_cursor("1. "))
+		self.add_menu_action(format_menu, "task_list", lambda: self.format_actions.insert_text_at_cursor("- [ ] "))
 		format_menu.addSeparator()
-		format_menu.addAction(translations[self.current_language]["link"], lambda: self.format_actions.insert_text_at_cursor("[Link Text](http://)"))
-		format_menu.addAction(translations[self.current_language]["image"], lambda: self.format_actions.insert_text_at_cursor("![Alt Text](url)"))
+		self.add_menu_action(format_menu, "link", lambda: self.format_actions.insert_text_at_cursor("[Link Text](http://)"))
+		self.add_menu_action(format_menu, "image", lambda: self.format_actions.insert_text_at_cursor("![Alt Text](url)"))
 		format_menu.addSeparator()
-		format_menu.addAction(translations[self.current_language]["inline_code"], lambda: self.format_actions.insert_wrapped_text("`", "`"))
-		format_menu.addAction(translations[self.current_language]["keyboard_key"], lambda: self.format_actions.insert_wrapped_text("<kbd>", "</kbd>"))
-		format_menu.addAction(translations[self.current_language]["code_block"], lambda: self.format_actions.insert_text_at_cursor("```\n\n```"))
+		self.add_menu_action(format_menu, "inline_code", lambda: self.format_actions.insert_wrapped_text("`", "`"))
+		self.add_menu_action(format_menu, "keyboard_key", lambda: self.format_actions.insert_wrapped_text("<kbd>", "</kbd>"))
+		self.add_menu_action(format_menu, "code_block", lambda: self.format_actions.insert_text_at_cursor("```\n\n```"))
 		format_menu.addSeparator()
-		format_menu.addAction(translations[self.current_language]["blockquote"], lambda: self.format_actions.insert_text_at_cursor("> "))
-		format_menu.addAction(translations[self.current_language]["horizontal_line"], lambda: self.format_actions.insert_text_at_cursor("\n---\n"))
+		self.add_menu_action(format_menu, "blockquote", lambda: self.format_actions.insert_text_at_cursor("> "))
+		self.add_menu_action(format_menu, "horizontal_line", lambda: self.format_actions.insert_text_at_cursor("\n---\n"))
 		format_menu.addSeparator()
-		format_menu.addAction(translations[self.current_language]["table"], self.insert_table_dialog)
-		format_menu.addAction(translations[self.current_language]["math_formula"], self.insert_math_equation)
+		self.add_menu_action(format_menu, "table", self.insert_table_dialog)
+		self.add_menu_action(format_menu, "math_formula", self.insert_math_equation)
 		# تم إضافة ميزة وسم الملاحظات هنا
 		format_menu.addSeparator()
-		format_menu.addAction(translations[self.current_language]["notes_tag"], self.insert_note)
-
-		format_action = QAction(translations[self.current_language]["format"], self)
-		format_action.setMenu(format_menu)
-		self.toolbar.addAction(format_action)
+		self.add_menu_action(format_menu, "notes_tag", self.insert_note)
 
 		self.toolbar.addSeparator()
 
-		find_replace_action = QAction(translations[self.current_language]["find_replace_title"], self)
-		find_replace_action.triggered.connect(self.search_replace.show_find_replace_dialog)
-		self.toolbar.addAction(find_replace_action)
+		self.add_toolbar_action("find_replace_title", self.search_replace.show_find_replace_dialog)
+		self.add_toolbar_action("find_in_files", self.find_in_files.show_panel)
+		self.add_toolbar_action("outline", self.outline.show_panel)
 
 		self.toolbar.addSeparator()
 
-		text_menu = QMenu(translations[self.current_language]["text"], self)
-		text_menu.addAction(translations[self.current_language]["to_uppercase"], lambda: self.format_actions.convert_case("upper"))
-		text_menu.addAction(translations[self.current_language]["to_lowercase"], lambda: self.format_actions.convert_case("lower"))
-		text_action = QAction(translations[self.current_language]["text"], self)
-		text_action.setMenu(text_menu)
-		self.toolbar.addAction(text_action)
+		text_menu = self.add_toolbar_menu("text")
+		self.add_menu_action(text_menu, "to_uppercase", lambda: self.format_actions.convert_case("upper"))
+		self.add_menu_action(text_menu, "to_lowercase", lambda: self.format_actions.convert_case("lower"))
 
 		self.toolbar.addSeparator()
 
-		export_html_action = QAction(translations[self.current_language]["export_html"], self)
-		export_html_action.triggered.connect(self.export_to_html)
-		self.toolbar.addAction(export_html_action)
+		self.add_toolbar_action("export_html", self.export_to_html)
 
 		self.toolbar.addSeparator()
 
-		toggle_theme_action = QAction(translations[self.current_language]["toggle_theme"], self)
-		toggle_theme_action.triggered.connect(self.theme_manager.toggle_theme)
-		self.toolbar.addAction(toggle_theme_action)
-
-		help_action = QAction(translations[self.current_language]["help"], self)
-		help_action.triggered.connect(self.show_help)
-		self.toolbar.addAction(help_action)
+		self.add_toolbar_action("toggle_theme", self.theme_manager.toggle_theme)
+		self.add_toolbar_action("help", self.show_help)
 
 		self.toolbar.addSeparator()
 
-		language_menu = QMenu(translations[self.current_language]["language"], self)
-		en_action = QAction("English", self)
-		ar_action = QAction("العربية", self)
-		zh_action = QAction("中文", self)
-		es_action = QAction("Español", self)
-		language_menu.addAction(en_action)
-		language_menu.addAction(ar_action)
-		language_menu.addAction(zh_action)
-		language_menu.addAction(es_action)
-
-		en_action.triggered.connect(lambda: self.change_language("en"))
-		ar_action.triggered.connect(lambda: self.change_language("ar"))
-		zh_action.triggered.connect(lambda: self.change_language("zh"))
-		es_action.triggered.connect(lambda: self.change_language("es"))
-
-		language_action = QAction(translations[self.current_language]["language"], self)
-		language_action.setMenu(language_menu)
-		self.toolbar.addAction(language_action)
+		# Language names are shown in their own language and never relabelled.
+		language_menu = self.add_toolbar_menu("language")
+		for lang, name in (("en", "English"), ("ar", "العربية"), ("zh", "中文"), ("es", "Español")):
+			language_menu.addAction(name, lambda lang=lang: self.change_language(lang))
+
+	def translate_label(self, set_text, key):
+		self.translated_labels.append((set_text, key))
+		set_text(translations[self.current_language][key])
+
+	def add_toolbar_action(self, key, slot):
+		action = QAction(self)
+		action.triggered.connect(slot)
+		self.translate_label(action.setText, key)
+		self.toolbar.addAction(action)
+		return action
+
+	def add_toolbar_menu(self, key):
+		menu = QMenu(self)
+		self.translate_label(menu.setTitle, key)
+		action = QAction(self)
+		action.setMenu(menu)
+		self.translate_label(action.setText, key)
+		self.toolbar.addAction(action)
+		return menu
+
+	def add_menu_action(self, menu, key, slot):
+		action = menu.addAction("", slot)
+		self.translate_label(action.setText, key)
+		return action
+
+	def retranslate_labels(self):
+		catalog = translations[self.current_language]
+		for set_text, key in self.translated_labels:
+			set_text(catalog[key])
 
 	def insert_table_dialog(self):
 		dialog = TableCreationDialog(self, self.current_language)
@@ -289,143 +345,40 @@ class MarkdownEditor(QMainWindow):
 			
 		self.statusBar_message.showMessage(translations[self.current_language]["math_formula_inserted"])
 
-	def update_counts(self, text_content):
-		if text_content is None:
-			text_content = ""
-		words = len(text_content.split())
-		chars = len(text_content)
+	def update_counts(self, words, chars):
 		if hasattr(self, 'word_count_label') and self.word_count_label is not None:
 			self.word_count_label.setText(translations[self.current_language]["word_count"].format(words))
 		if hasattr(self, 'char_count_label') and self.char_count_label is not None:
 			self.char_count_label.setText(translations[self.current_language]["char_count"].format(chars))
 
-	def update_preview_and_counts(self):
-		editor = self.get_current_editor()
-		preview = self.get_current_preview()
-		if not editor or not preview: return
+	def update_preview_and_counts(self, container):
+		# Background tabs are edited too (Replace All in open files), so the
+		# tab is the one whose editor changed, not the current one.
+		self.render_scheduler.schedule(container)
+		if container is self.get_current_container_widget():
+			self.update_counts(container.stats.words, container.stats.chars)
+
+	def apply_preview(self, container, blocks):
+		container.preview_blocks = blocks
+		container.preview_stale = False
+		self.scroll_sync.update_preview(container, blocks)
+
+	def show_load_progress(self, name, done, size):
+		# A size of 0 shows a busy indicator until the file size is known.
+		self.load_progress.setRange(0, 1000 if size else 0)
+		if size:
+			self.load_progress.setValue(int(done * 1000 / size))
+		self.load_progress.setToolTip(translations[self.current_language]["loading_file"].format(name))
+		self.load_progress.show()
+		self.load_cancel_button.show()
+
+	def hide_load_progress(self):
+		self.load_progress.hide()
+		self.load_cancel_button.hide()
+
+	def show_render_error(self, error):
+		self.statusBar_message.showMessage(f"{translations[self.current_language]['error']}: {error}")
 
-		raw_text = editor.toPlainText()
-		html = markdown.markdown(raw_text, extensions=['fenced_code', 'tables', 'codehilite', 'toc', 'markdown_checklist.extension', 'footnotes','extra'])
-		
-		html = re.sub(r'~~(.*?)~~', r'<del>\1</del>', html)
-		
-		html = re.sub(r'<li>\s*\[\s*\]\s*(.*?)</li>', r'<li>☐ \1</li>', html)
-		html = re.sub(r'<li>\s*\[\s*x\s*\]\s*(.*?)</li>', r'<li>✅ \1</li>', html)
-		
-		html = re.sub(
-			r'<img(.*?)(/?)>',
-			r'<img\1 style="max-width:200px; height:auto;"\2>',
-			html
-		)
-
-		
-		html = html.replace('<li><p>[ ]', '<li><p>☐')
-		html = html.replace('<li><p>[x]', '<li><p>✅')
-
-		if self.theme_manager.is_dark_theme:
-			text_color = "#f0f0f0"
-			link_color = "#99c1ff"
-			border_color = "#555"
-			header_bg = "#444"
-			code_bg = "#3a3a3a"
-			kbd_bg = "#2b2b2b"
-			kbd_border = "#4b4b4b"
-			footnote_link_color = "#99c1ff"
-			footnote_border = "#444"
-			footnote_hr = "#666"
-		else:
-			text_color = "#000000"
-			link_color = "#0000ee"
-			border_color = "#ddd"
-			header_bg = "#f2f2f2"
-			code_bg = "#eaeaea"
-			kbd_bg = "#f8f8f8"
-			kbd_border = "#ccc"
-			footnote_link_color = "#0000ee"
-			footnote_border = "#ccc"
-			footnote_hr = "#ccc"
-
-		
-		css_style = f"""
-			<style>
-				body {{
-					font-family: Arial, sans-serif;
-					color: {text_color};
-				}}
-				a {{
-					color: {link_color};
-				}}
-				table {{
-					border-collapse: collapse;
-					width: 100%;
-					margin-top: 10px;
-					margin-bottom: 10px;
-				}}
-				th, td {{
-					border: 1px solid {border_color};
-					padding: 8px;
-					text-align: left;
-				}}
-				th {{
-					background-color: {header_bg};
-					font-weight: bold;
-				}}
-				pre {{
-					background-color: {code_bg};
-					padding: 10px;
-					border-radius: 5px;
-					overflow-x: auto;
-				}}
-				code {{
-					font-family: 'Courier New', Courier, monospace;
-				}}
-				kbd {{
-					font-family: monospace;
-					padding: 2px 4px;
-					border: 1px solid {kbd_border};
-					border-radius: 3px;
-					background-color: {kbd_bg};
-					font-size: 0.9em;
-					color: {text_color};
-					white-space: nowrap;
-					box-shadow: 0 1px 0 rgba(0, 0, 0, 0.2), 0 0 0 2px #fff inset;
-				}}
-				
-				.footnote-ref a {{
-					color: {footnote_link_color};
-					font-size: 0.8em;
-					text-decoration: none;
-				}}
-				.footnote-backref {{
-					font-size: 0.8em;
-				}}
-				.footnote-backref a {{
-					color: {footnote_link_color};
-					text-decoration: none;
-				}}
-				hr.footnotes-sep {{
-					border: 0;
-					height: 1px;
-					background-color: {footnote_hr};
-					margin-top: 20px;
-					margin-bottom: 20px;
-				}}
-
-				del {{
-					text-decoration: line-through;
-					color: inherit;
-				}}
-			</style>
-		<script src="https://polyfill.io/v3/polyfill.min.js?features=es6"></script>
-		<script id="MathJax-script" async src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js"></script>
-		"""
-		preview.setHtml(css_style + html)
-		self.update_counts(raw_text)
-		
-		current_editor = self.get_current_editor()
-		if current_editor:
-			self.file_manager.set_tab_modified_by_editor(current_editor, True)
-			
 	def update_window_title(self):
 		base_title = translations[self.current_language]["app_title"]
 		current_file = self.get_current_file()
@@ -440,8 +393,8 @@ class MarkdownEditor(QMainWindow):
 		QMessageBox.information(self, translations[self.current_language]["help"], help_text)
 
 	def export_to_html(self):
-		current_preview = self.get_current_preview()
-		if not current_preview:
+		current_editor = self.get_current_editor()
+		if not current_editor:
 			QMessageBox.warning(self, translations[self.current_language]["error"], translations[self.current_language]["no_content_to_export"])
 			return
 
@@ -453,19 +406,29 @@ class MarkdownEditor(QMainWindow):
 
 		path, _ = QFileDialog.getSaveFileName(self, translations[self.current_language]["export_html"],
 											  suggested_name, "HTML Files (*.html)")
-		if path:
-			try:
-				with open(path, "w", encoding="utf-8") as f:
-					f.write(current_preview.toHtml())
-				self.statusBar_message.showMessage(translations[self.current_language]["html_file_saved"].format(path))
-			except Exception as e:
-				QMessageBox.warning(self, translations[self.current_language]["error"], translations[self.current_language]["export_error"].format(str(e)))
+		if not path:
+			return
+		options_dialog = ExportOptionsDialog(self, self.current_language)
+		if options_dialog.exec_() != QDialog.Accepted:
+			return
+		minify, embed_images = options_dialog.get_options()
+		title = os.path.splitext(os.path.basename(current_file_path))[0] if current_file_path else ""
+		# Relative image paths resolve against the Markdown file, as in the preview.
+		base_dir = os.path.dirname(current_file_path) if current_file_path else os.path.dirname(path)
+		self.export_worker.export(path, current_editor.toPlainText(), self.theme_manager.preview_stylesheet,
+								  title, base_dir, minify, embed_images)
+
+	def html_exported(self, path):
+		self.statusBar_message.showMessage(translations[self.current_language]["html_file_saved"].format(path))
+
+	def html_export_failed(self, error):
+		QMessageBox.warning(self, translations[self.current_language]["error"], translations[self.current_language]["export_error"].format(error))
 	
 	def change_language(self, lang):
 		if lang not in translations:
 			return
 		self.current_language = lang
-		self.create_toolbar()
+		self.retranslate_labels()
 		self.update_window_title()
 		self.statusBar_message.showMessage(translations[self.current_language]["language_changed"])
 		for i in range(self.tab_widget.count()):
@@ -475,11 +438,12 @@ class MarkdownEditor(QMainWindow):
 				if hasattr(container_widget, 'is_modified') and container_widget.is_modified:
 					tab_title += "*"
 				self.tab_widget.setTabText(i, tab_title)
-				if hasattr(container_widget, 'editor') and hasattr(container_widget, 'preview'):
-					self.theme_manager.update_single_tab_preview(container_widget.editor, container_widget.preview)
 
 		if self.search_replace.find_replace_dialog:
 			self.search_replace.find_replace_dialog.update_language(self.current_language)
+			self.search_replace.update_match_label()
+		self.find_in_files.update_language(self.current_language)
+		self.outline.update_language(self.current_language)
 		self.update_status_bar_for_current_tab()
 	
 	def insert_note(self):
@@ -0,0 +1,57 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+from html_export import render_page
+from utils import atomic_write
+
+
+class ExportSignals(QObject):
+    finished = pyqtSignal(str)
+    failed = pyqtSignal(str, str)
+
+
+class ExportTask(QRunnable):
+    def __init__(self, path, text, css, title, base_dir, minify, embed_images, signals):
+        super().__init__()
+        self.path = path
+        self.text = text
+        self.css = css
+        self.title = title
+        self.base_dir = base_dir
+        self.minify = minify
+        self.embed_images = embed_images
+        self.signals = signals
+
+    def run(self):
+        try:
+            atomic_write(self.path, render_page(self.text, self.css, self.title, self.base_dir, self.minify, self.embed_images))
+        except Exception as e:
+            self.signals.failed.emit(self.path, str(e))
+            return
+        self.signals.finished.emit(self.path)
+
+
+class ExportWorker(QObject):
+    # Renders the editor source again and writes the page off the UI thread.
+    def __init__(self, main_window):
+        super().__init__(main_window)
+        self.main_window = main_window
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+        self.signals = ExportSignals()
+        self.signals.finished.connect(self.on_export_finished)
+        self.signals.failed.connect(self.on_export_failed)
+
+    def export(self, path, text, css, title="", base_dir=None, minify=False, embed_images=False):
+        self.pool.start(ExportTask(path, text, css, title, base_dir, minify, embed_images, self.signals))
+
+    def wait(self):
+        self.pool.waitForDone()
+
+    @pyqtSlot(str)
+    def on_export_finished(self, path):
+        self.main_window.html_exported(path)
+
+    @pyqtSlot(str, str)
+    def on_export_failed(self, path, error):
+        self.main_window.html_export_failed(error)
@@ -0,0 +1,180 @@
+import codecs
+import io
+import mmap
+import os
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtWidgets import QMessageBox
+
+from translations import translations
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class LoadSignals(QObject):
+    chunk = pyqtSignal(object, str)
+    progress = pyqtSignal(object, int, int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object, str)
+
+
+class LoadJob(QRunnable):
+    def __init__(self, container, path, signals):
+        super().__init__()
+        self.container = container
+        self.path = path
+        self.signals = signals
+        self.cancelled = False
+
+    def run(self):
+        try:
+            self.read()
+        except (OSError, ValueError) as e:
+            self.signals.failed.emit(self, str(e))
+            return
+        if not self.cancelled:
+            self.signals.finished.emit(self)
+
+    def read(self):
+        # Same decoding as open(path, "r", encoding="utf-8"), but in pieces.
+        decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(), translate=True)
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            for data, done in self.chunks(f, size):
+                if self.cancelled:
+                    return
+                text = decoder.decode(data)
+                if text:
+                    self.signals.chunk.emit(self, text)
+                self.signals.progress.emit(self, done, size)
+        text = decoder.decode(b"", final=True)
+        if text:
+            self.signals.chunk.emit(self, text)
+
+    def chunks(self, f, size):
+        try:
+            view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        except (OSError, ValueError):
+            view = None
+        if view is None:
+            done = 0
+            while True:
+                data = f.read(CHUNK_SIZE)
+                if not data:
+                    return
+                done += len(data)
+                yield data, done
+        with view:
+            for offset in range(0, size, CHUNK_SIZE):
+                data = view[offset:offset + CHUNK_SIZE]
+                yield data, offset + len(data)
+
+
+class FileLoader(QObject):
+    def __init__(self, main_window):
+        super().__init__(main_window)
+        self.main_window = main_window
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+        self.jobs = []
+
+        self.signals = LoadSignals()
+        self.signals.chunk.connect(self.on_chunk)
+        self.signals.progress.connect(self.on_progress)
+        self.signals.finished.connect(self.on_finished)
+        self.signals.failed.connect(self.on_failed)
+
+    def load(self, container, path):
+        self.cancel(container)
+        editor = container.editor
+        # While loading, the tab is read-only, not undoable and does not
+        # trigger previews or the modified marker; the first render happens
+        # once the whole file is in.
+        editor.blockSignals(True)
+        editor.setReadOnly(True)
+        editor.document().setUndoRedoEnabled(False)
+        editor.clear()
+        self.main_window.render_scheduler.cancel(container)
+
+        job = LoadJob(container, path, self.signals)
+        container.loading_job = job
+        self.jobs.append(job)
+        self.main_window.show_load_progress(os.path.basename(path), 0, 0)
+        self.pool.start(job)
+
+    def is_loading(self, container):
+        return container is not None and getattr(container, 'loading_job', None) is not None
+
+    def cancel(self, container):
+        job = getattr(container, 'loading_job', None)
+        if job is None:
+            return False
+        job.cancelled = True
+        self.end_job(job)
+        return True
+
+    def cancel_current(self):
+        container = self.main_window.get_current_container_widget()
+        if not self.is_loading(container):
+            if not self.jobs:
+                return
+            container = self.jobs[-1].container
+        self.cancel(container)
+        self.main_window.file_manager.reset_tab(container)
+        self.main_window.statusBar_message.showMessage(translations[self.main_window.current_language]["file_load_cancelled"])
+
+    def end_job(self, job):
+        container = job.container
+        container.loading_job = None
+        if job in self.jobs:
+            self.jobs.remove(job)
+
+        editor = container.editor
+        editor.document().setUndoRedoEnabled(True)
+        editor.setReadOnly(False)
+        editor.blockSignals(False)
+        editor.moveCursor(QTextCursor.Start)
+        if not self.jobs:
+            self.main_window.hide_load_progress()
+
+    def is_current(self, job):
+        return not job.cancelled and getattr(job.container, 'loading_job', None) is job
+
+    @pyqtSlot(object, str)
+    def on_chunk(self, job, text):
+        if not self.is_current(job):
+            return
+        cursor = QTextCursor(job.container.editor.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+
+    @pyqtSlot(object, int, int)
+    def on_progress(self, job, done, size):
+        if self.is_current(job):
+            self.main_window.show_load_progress(os.path.basename(job.path), done, size)
+
+    @pyqtSlot(object)
+    def on_finished(self, job):
+        if not self.is_current(job):
+            return
+        container = job.container
+        self.end_job(job)
+        self.main_window.file_manager.set_tab_modified(container, False)
+        self.main_window.render_scheduler.render_now(container)
+        if container is self.main_window.get_current_container_widget():
+            self.main_window.update_status_bar_for_current_tab()
+        if getattr(container, 'pending_line', None):
+            self.main_window.file_manager.go_to_line(container, container.pending_line)
+            container.pending_line = None
+        self.main_window.session_manager.restore_view(container)
+        self.main_window.statusBar_message.showMessage(translations[self.main_window.current_language]["file_opened"])
+
+    @pyqtSlot(object, str)
+    def on_failed(self, job, error):
+        if not self.is_current(job):
+            return
+        container = job.container
+        self.end_job(job)
+        self.main_window.file_manager.reset_tab(container)
+        QMessageBox.critical(self.main_window, translations[self.main_window.current_language]["error"], f"Failed to open file: {error}")
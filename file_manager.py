@@ -18,31 +18,70 @@ class FileManager:
             "Markdown files (*.md *.markdown);;Text files (*.txt);;All files (*.*)"
         )
         if path:
-            if self.parent.tab_widget.count() == 1 and not self.parent.get_current_editor().toPlainText() and not self.parent.get_current_file():
-                self.parent.tab_widget.currentWidget().current_file = path
-                self.load_file(path, self.parent.get_current_editor())
-                self.parent.set_current_file(path)
+            self.open_path(path)
+
+    def tab_index(self, path, skip=None):
+        real_path = os.path.realpath(path)
+        for i in range(self.parent.tab_widget.count()):
+            container = self.parent.tab_widget.widget(i)
+            if container is not skip and container.current_file and os.path.realpath(container.current_file) == real_path:
+                return i
+        return -1
+
+    def open_path(self, path, line_number=None):
+        index = self.tab_index(path)
+        if index != -1:
+            container = self.parent.tab_widget.widget(index)
+            self.parent.tab_widget.setCurrentIndex(index)
+            if line_number and not self.parent.file_loader.is_loading(container):
+                self.go_to_line(container, line_number)
             else:
-                self.parent.add_new_tab(file_path=path)
-                self.load_file(path, self.parent.get_current_editor())
-
-    def load_file(self, path, editor):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                content = f.read()
-            editor.setPlainText(content)
-            self.parent.statusBar_message.showMessage(translations[self.parent.current_language]["file_opened"])
-        except Exception as e:
-            QMessageBox.critical(self.parent, translations[self.parent.current_language]["error"], f"Failed to open file: {e}")
-
-    def save_file(self):
+                container.pending_line = line_number
+            return
+
+        if self.parent.tab_widget.count() == 1 and not self.parent.get_current_editor().toPlainText() and not self.parent.get_current_file():
+            self.parent.set_current_file(path)
+        else:
+            self.parent.add_new_tab(file_path=path)
+        container = self.parent.get_current_container_widget()
+        container.pending_line = line_number
+        self.load_file(path, container)
+
+    def go_to_line(self, container, line_number):
+        editor = container.editor
+        block = editor.document().findBlockByNumber(max(line_number - 1, 0))
+        if not block.isValid():
+            block = editor.document().lastBlock()
+        cursor = editor.textCursor()
+        cursor.setPosition(block.position())
+        editor.setTextCursor(cursor)
+        editor.ensureCursorVisible()
+        editor.setFocus()
+
+    def load_file(self, path, container):
+        # Read in the background; the loader fills the editor chunk by chunk
+        # and renders the preview once the whole file is in.
+        self.parent.file_loader.load(container, path)
+        self.parent.statusBar_message.showMessage(translations[self.parent.current_language]["loading_file"].format(os.path.basename(path)))
+
+    def reset_tab(self, container):
+        container.current_file = None
+        container.editor.clear()
+        tab_index = self.parent.tab_widget.indexOf(container)
+        if tab_index != -1:
+            self.parent.tab_widget.setTabText(tab_index, translations[self.parent.current_language]["untitled_file"])
+        self.set_tab_modified(container, False)
+        self.parent.render_scheduler.render_now(container)
+        self.parent.update_window_title()
+
+    def save_file(self, wait=False):
         current_file = self.parent.get_current_file()
         if not current_file:
-            self.save_file_as()
+            self.save_file_as(wait)
         else:
-            self.save_to_path(current_file)
+            self.save_to_path(current_file, wait)
 
-    def save_file_as(self):
+    def save_file_as(self, wait=False):
         path, _ = QFileDialog.getSaveFileName(
             self.parent, 
             translations[self.parent.current_language]["save_as"], 
@@ -50,34 +89,51 @@ class FileManager:
             "Markdown files (*.md *.markdown);;Text files (*.txt);;All files (*.*)"
         )
         if path:
-            self.save_to_path(path)
-            self.parent.set_current_file(path)
+            # The tab takes the new name once the file is written.
+            self.save_to_path(path, wait)
 
-    def save_to_path(self, path):
-        editor = self.parent.get_current_editor()
-        if not editor:
+    def save_to_path(self, path, wait=False):
+        container = self.parent.get_current_container_widget()
+        if not container or not hasattr(container, 'editor') or self.parent.file_loader.is_loading(container):
             return
-        
-        try:
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(editor.toPlainText())
-            self.parent.statusBar_message.showMessage(translations[self.parent.current_language]["file_saved"])
-            self.parent.file_manager.set_tab_modified_by_editor(editor, False)
-        except Exception as e:
-            QMessageBox.critical(self.parent, translations[self.parent.current_language]["error"], f"Failed to save file: {e}")
+        # The text is snapshotted here and written in the background unless
+        # the caller needs the result right away (closing a tab or the window).
+        self.parent.file_saver.save(container, path, wait)
+
+    def file_saved(self, container, path, revision):
+        self.parent.statusBar_message.showMessage(translations[self.parent.current_language]["file_saved"])
+        if container.current_file != path:
+            self.parent.set_current_file(path, container)
+            self.parent.update_window_title()
+        # Edits made while the write was running keep the tab modified. The
+        # recovery log was based on the file as it was before this save, so
+        # it starts over from the whole text.
+        if container.editor.document().revision() == revision:
+            self.set_tab_modified(container, False)
+        else:
+            self.parent.recovery_journal.checkpoint(container)
+
+    def show_save_error(self, error):
+        QMessageBox.critical(self.parent, translations[self.parent.current_language]["error"], f"Failed to save file: {error}")
 
     def set_tab_modified_by_editor(self, editor, is_modified):
-        container = self.parent.tab_widget.findChild(self.parent.tab_widget.currentWidget().__class__, "container")
-        
-        tab_index = self.parent.tab_widget.indexOf(editor.parentWidget())
+        for i in range(self.parent.tab_widget.count()):
+            container = self.parent.tab_widget.widget(i)
+            if getattr(container, 'editor', None) is editor:
+                self.set_tab_modified(container, is_modified)
+                return
+
+    def set_tab_modified(self, container, is_modified):
+        tab_index = self.parent.tab_widget.indexOf(container)
         if tab_index == -1: return
 
         if is_modified and not self.parent.tab_widget.tabText(tab_index).endswith("*"):
             self.parent.tab_widget.setTabText(tab_index, self.parent.tab_widget.tabText(tab_index) + "*")
-            editor.parentWidget().is_modified = True
         elif not is_modified and self.parent.tab_widget.tabText(tab_index).endswith("*"):
             self.parent.tab_widget.setTabText(tab_index, self.parent.tab_widget.tabText(tab_index).rstrip('*'))
-            editor.parentWidget().is_modified = False
+        container.is_modified = is_modified
+        if not is_modified:
+            self.parent.recovery_journal.discard(container)
 
     def close_tab(self, index):
         container = self.parent.tab_widget.widget(index)
@@ -90,17 +146,25 @@ class FileManager:
             )
             if reply == QMessageBox.Yes:
                 self.parent.tab_widget.setCurrentIndex(index)
-                self.save_file()
+                self.save_file(wait=True)
                 if not container.is_modified:
-                    self.parent.tab_widget.removeTab(index)
+                    self.remove_tab(index)
             elif reply == QMessageBox.No:
-                self.parent.tab_widget.removeTab(index)
+                self.remove_tab(index)
         else:
-            self.parent.tab_widget.removeTab(index)
+            self.remove_tab(index)
         
         if self.parent.tab_widget.count() == 0:
             self.parent.new_file()
             
+    def remove_tab(self, index):
+        self.parent.file_loader.cancel(self.parent.tab_widget.widget(index))
+        self.parent.file_saver.wait(self.parent.tab_widget.widget(index))
+        self.parent.recovery_journal.detach(self.parent.tab_widget.widget(index))
+        self.parent.search_replace.forget_tab(self.parent.tab_widget.widget(index))
+        self.parent.render_scheduler.cancel(self.parent.tab_widget.widget(index))
+        self.parent.tab_widget.removeTab(index)
+
     def closeEvent(self, event):
         for i in range(self.parent.tab_widget.count()):
             container = self.parent.tab_widget.widget(i)
@@ -114,8 +178,12 @@ class FileManager:
                     QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel
                 )
                 if reply == QMessageBox.Yes:
-                    self.save_file()
+                    self.save_file(wait=True)
                 elif reply == QMessageBox.Cancel:
                     event.ignore()
                     return
+        self.parent.file_saver.wait()
+        self.parent.export_worker.wait()
+        self.parent.session_manager.save()
+        self.parent.recovery_journal.close_session()
         event.accept()
@@ -0,0 +1,104 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+from utils import atomic_write
+
+MAX_SAVE_THREADS = 2
+
+
+class SaveSignals(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object, str)
+
+
+class SaveJob(QRunnable):
+    def __init__(self, container, path, text, revision, signals):
+        super().__init__()
+        self.container = container
+        self.path = path
+        self.text = text
+        self.revision = revision
+        self.signals = signals
+
+    def run(self):
+        try:
+            atomic_write(self.path, self.text)
+        except Exception as e:
+            self.signals.failed.emit(self, str(e))
+            return
+        self.signals.finished.emit(self)
+
+
+class FileSaver(QObject):
+    def __init__(self, main_window):
+        super().__init__(main_window)
+        self.main_window = main_window
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(MAX_SAVE_THREADS)
+
+        self.signals = SaveSignals()
+        self.signals.finished.connect(self.on_save_finished)
+        self.signals.failed.connect(self.on_save_failed)
+
+    def save(self, container, path, wait=False):
+        document = container.editor.document()
+        job = SaveJob(container, path, container.editor.toPlainText(), document.revision(), self.signals)
+        if wait:
+            return self.save_now(job)
+
+        # One write per tab at a time; saves requested meanwhile collapse into
+        # the newest snapshot, written once the running one is done.
+        if getattr(container, 'save_in_flight', None) is not None:
+            container.save_pending = job
+            return True
+        self.start(job)
+        return True
+
+    def save_now(self, job):
+        container = job.container
+        container.save_pending = None
+        self.wait(container)
+        try:
+            atomic_write(job.path, job.text)
+        except Exception as e:
+            self.main_window.file_manager.show_save_error(str(e))
+            return False
+        self.main_window.file_manager.file_saved(container, job.path, job.revision)
+        return True
+
+    def start(self, job):
+        job.container.save_in_flight = job
+        job.container.save_pending = None
+        self.pool.start(job)
+
+    def is_saving(self, container):
+        return getattr(container, 'save_in_flight', None) is not None
+
+    def wait(self, container=None):
+        # Results of writes that finish here arrive as queued signals and are
+        # dropped, since the caller takes over from this point.
+        if container is None or self.is_saving(container):
+            self.pool.waitForDone()
+        if container is not None:
+            container.save_in_flight = None
+
+    def next(self, job):
+        container = job.container
+        if getattr(container, 'save_in_flight', None) is not job:
+            return False
+        container.save_in_flight = None
+        pending = getattr(container, 'save_pending', None)
+        if pending is not None:
+            self.start(pending)
+        return True
+
+    @pyqtSlot(object)
+    def on_save_finished(self, job):
+        if not self.next(job):
+            return
+        if not self.is_saving(job.container):
+            self.main_window.file_manager.file_saved(job.container, job.path, job.revision)
+
+    @pyqtSlot(object, str)
+    def on_save_failed(self, job, error):
+        if self.next(job):
+            self.main_window.file_manager.show_save_error(error)
@@ -0,0 +1,391 @@
+import os
+import re
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, Qt, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtWidgets import (
+    QCheckBox, QDockWidget, QFileDialog, QFormLayout, QHBoxLayout, QLabel, QLineEdit,
+    QMessageBox, QPushButton, QTreeWidget, QTreeWidgetItem, QVBoxLayout, QWidget
+)
+
+from translations import translations
+from replace_engine import compile_pattern, plan_replacements
+from project_search import MARKDOWN_SUFFIXES, iter_markdown_files, replace_files, search_files, search_text
+
+# Files handed to a worker at a time, and batches kept queued per worker so
+# the walk never runs far ahead of the search.
+BATCH_SIZE = 64
+MAX_WORKERS = os.cpu_count() or 2
+QUEUED_PER_WORKER = 2
+
+
+def make_executor():
+    # Searching is CPU bound Python, so separate processes scale where
+    # threads would share the GIL. multiprocessing and concurrent.futures
+    # are imported on first use to keep them off the startup path.
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    try:
+        return ProcessPoolExecutor(MAX_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    except (OSError, ValueError, NotImplementedError):
+        return ThreadPoolExecutor(MAX_WORKERS)
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class ProjectSignals(QObject):
+    results = pyqtSignal(object, object)
+    finished = pyqtSignal(object, int)
+    failed = pyqtSignal(object, str)
+
+
+class ProjectJob(QRunnable):
+    def __init__(self, root, function, args, skip, signals):
+        super().__init__()
+        self.root = root
+        self.function = function
+        self.args = args
+        self.skip = skip
+        self.signals = signals
+        self.cancelled = False
+
+    def run(self):
+        # Whatever a worker raises (a dead process pool, an unreadable file,
+        # a bad replacement) ends the job as failed, so the panel never
+        # waits for a job that is gone.
+        try:
+            scanned = self.scan()
+        except Exception as e:
+            self.signals.failed.emit(self, str(e))
+            return
+        if not self.cancelled:
+            self.signals.finished.emit(self, scanned)
+
+    def scan(self):
+        from concurrent.futures import FIRST_COMPLETED, wait
+        executor = make_executor()
+        pending = set()
+        scanned = 0
+        try:
+            for batch in batched(iter_markdown_files(self.root), BATCH_SIZE):
+                if self.cancelled:
+                    break
+                batch = [path for path in batch if os.path.realpath(path) not in self.skip]
+                scanned += len(batch)
+                pending.add(executor.submit(self.function, batch, *self.args))
+                if len(pending) >= MAX_WORKERS * QUEUED_PER_WORKER:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self.emit_results(done)
+            while pending and not self.cancelled:
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                self.emit_results(done)
+        finally:
+            executor.shutdown(wait=not self.cancelled, cancel_futures=True)
+        return scanned
+
+    def emit_results(self, done):
+        for future in done:
+            if not self.cancelled:
+                self.signals.results.emit(self, future.result())
+
+
+class FindInFilesPanel(QDockWidget):
+    def __init__(self, parent=None, current_language="en"):
+        super().__init__(parent)
+        self.setObjectName("find_in_files")
+
+        self.folder_input = QLineEdit()
+        self.browse_button = QPushButton()
+        folder_layout = QHBoxLayout()
+        folder_layout.addWidget(self.folder_input)
+        folder_layout.addWidget(self.browse_button)
+
+        self.find_input = QLineEdit()
+        self.replace_input = QLineEdit()
+        self.folder_label = QLabel()
+        self.find_label = QLabel()
+        self.replace_label = QLabel()
+
+        options_layout = QHBoxLayout()
+        self.case_checkbox = QCheckBox()
+        self.whole_word_checkbox = QCheckBox()
+        self.regex_checkbox = QCheckBox()
+        options_layout.addWidget(self.case_checkbox)
+        options_layout.addWidget(self.whole_word_checkbox)
+        options_layout.addWidget(self.regex_checkbox)
+
+        buttons_layout = QHBoxLayout()
+        self.search_button = QPushButton()
+        self.replace_button = QPushButton()
+        self.stop_button = QPushButton()
+        self.stop_button.setEnabled(False)
+        buttons_layout.addWidget(self.search_button)
+        buttons_layout.addWidget(self.replace_button)
+        buttons_layout.addWidget(self.stop_button)
+
+        form = QFormLayout()
+        form.addRow(self.folder_label, folder_layout)
+        form.addRow(self.find_label, self.find_input)
+        form.addRow(self.replace_label, self.replace_input)
+        form.addRow("", options_layout)
+        form.addRow("", buttons_layout)
+
+        self.status_label = QLabel("")
+        self.results = QTreeWidget()
+        self.results.setColumnCount(2)
+        self.results.setHeaderHidden(True)
+        self.results.setUniformRowHeights(True)
+
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        layout.addLayout(form)
+        layout.addWidget(self.status_label)
+        layout.addWidget(self.results)
+        self.setWidget(widget)
+
+        self.update_language(current_language)
+
+    def update_language(self, new_language):
+        self.setWindowTitle(translations[new_language]["find_in_files"])
+        self.folder_label.setText(translations[new_language]["folder_label"])
+        self.find_label.setText(translations[new_language]["find_label"])
+        self.replace_label.setText(translations[new_language]["replace_label"])
+        self.browse_button.setText(translations[new_language]["browse"])
+        self.case_checkbox.setText(translations[new_language]["match_case"])
+        self.whole_word_checkbox.setText(translations[new_language]["whole_words"])
+        self.regex_checkbox.setText(translations[new_language]["use_regex"])
+        self.search_button.setText(translations[new_language]["search"])
+        self.replace_button.setText(translations[new_language]["replace_in_files"])
+        self.stop_button.setText(translations[new_language]["stop"])
+
+
+class FindInFiles(QObject):
+    def __init__(self, main_window):
+        super().__init__(main_window)
+        self.main_window = main_window
+        self.panel = None
+        self.job = None
+        # Room for a new job while a stopped one is still winding down.
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+
+        self.signals = ProjectSignals()
+        self.signals.results.connect(self.on_results)
+        self.signals.finished.connect(self.on_finished)
+        self.signals.failed.connect(self.on_failed)
+
+    def translate(self, key):
+        return translations[self.main_window.current_language][key]
+
+    def show_panel(self):
+        if not self.panel:
+            self.panel = FindInFilesPanel(self.main_window, self.main_window.current_language)
+            self.panel.browse_button.clicked.connect(self.choose_folder)
+            self.panel.search_button.clicked.connect(self.start_search)
+            self.panel.find_input.returnPressed.connect(self.start_search)
+            self.panel.replace_button.clicked.connect(self.start_replace)
+            self.panel.stop_button.clicked.connect(self.stop)
+            self.panel.results.itemActivated.connect(self.open_hit)
+            self.main_window.addDockWidget(Qt.BottomDockWidgetArea, self.panel)
+        if not self.panel.folder_input.text():
+            current_file = self.main_window.get_current_file()
+            self.panel.folder_input.setText(os.path.dirname(current_file) if current_file else os.getcwd())
+        self.panel.show()
+        self.panel.raise_()
+        self.panel.find_input.setFocus()
+        self.panel.find_input.selectAll()
+
+    def update_language(self, lang):
+        if self.panel:
+            self.panel.update_language(lang)
+
+    def choose_folder(self):
+        folder = QFileDialog.getExistingDirectory(self.main_window, self.translate("find_in_files"), self.panel.folder_input.text())
+        if folder:
+            self.panel.folder_input.setText(folder)
+
+    def current_pattern(self):
+        panel = self.panel
+        if not panel.find_input.text():
+            return None
+        try:
+            return compile_pattern(panel.find_input.text(), panel.case_checkbox.isChecked(), panel.whole_word_checkbox.isChecked(), panel.regex_checkbox.isChecked())
+        except re.error as e:
+            panel.status_label.setText(self.translate("invalid_regex").format(e))
+            return None
+
+    def root(self):
+        root = os.path.realpath(os.path.expanduser(self.panel.folder_input.text()))
+        if not os.path.isdir(root):
+            self.panel.status_label.setText(self.translate("folder_not_found").format(root))
+            return None
+        return root
+
+    def tabs_under(self, root):
+        # (path, container) of every tab whose file lies under root.
+        for i in range(self.main_window.tab_widget.count()):
+            container = self.main_window.tab_widget.widget(i)
+            path = getattr(container, 'current_file', None)
+            if not path:
+                continue
+            path = os.path.realpath(path)
+            if path.startswith(root + os.sep) and path.lower().endswith(MARKDOWN_SUFFIXES):
+                yield path, container
+
+    def open_tabs(self, root):
+        # Tabs whose text is searched or replaced in the editor instead of on
+        # disk. Tabs restored from the session but never shown, or still
+        # loading, do not hold the whole text yet.
+        return {path: container for path, container in self.tabs_under(root)
+                if not self.main_window.file_loader.is_loading(container) and not self.main_window.session_manager.is_placeholder(container)}
+
+    def start_job(self, root, function, args, skip):
+        self.stop()
+        self.job = ProjectJob(root, function, args, set(skip), self.signals)
+        self.job.mode = function
+        self.job.hits = 0
+        self.job.files = 0
+        self.job.errors = 0
+        self.panel.stop_button.setEnabled(True)
+        self.panel.status_label.setText(self.translate("searching"))
+        self.pool.start(self.job)
+
+    def start_search(self):
+        pattern = self.current_pattern()
+        root = self.root() if pattern else None
+        if not root:
+            return
+        self.panel.results.clear()
+        tabs = self.open_tabs(root)
+        modified = {path: container for path, container in tabs.items() if container.is_modified}
+        self.start_job(root, search_files, (pattern,), modified)
+        results = []
+        for path, container in sorted(modified.items()):
+            hits = search_text(container.editor.toPlainText(), pattern)
+            if hits:
+                results.append((path, hits))
+        self.add_results(results)
+
+    def start_replace(self):
+        pattern = self.current_pattern()
+        root = self.root() if pattern else None
+        if not root:
+            return
+        replacement = self.panel.replace_input.text()
+        regex = self.panel.regex_checkbox.isChecked()
+        if regex:
+            try:
+                pattern.sub(replacement, "")
+            except (re.error, IndexError) as e:
+                self.panel.status_label.setText(self.translate("invalid_regex").format(e))
+                return
+        reply = QMessageBox.question(self.main_window, self.translate("replace_in_files"), self.translate("replace_in_files_prompt").format(root),
+                                     QMessageBox.Yes | QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+
+        self.panel.results.clear()
+        tabs = self.open_tabs(root)
+        # Files of the other tabs are not rewritten either: a loader may be
+        # reading them, and a placeholder will read them when it is shown.
+        self.start_job(root, replace_files, (pattern, replacement, regex), [path for path, _ in self.tabs_under(root)])
+        # Open files change in their tab, as one undo step each, and are
+        # saved by the user as usual.
+        for path, container in sorted(tabs.items()):
+            editor = container.editor
+            replacements = plan_replacements(pattern, editor.toPlainText(), replacement, regex)
+            if not replacements:
+                continue
+            cursor = QTextCursor(editor.document())
+            cursor.beginEditBlock()
+            for start, end, new_text in reversed(replacements):
+                cursor.setPosition(start)
+                cursor.setPosition(end, QTextCursor.KeepAnchor)
+                cursor.insertText(new_text)
+            cursor.endEditBlock()
+            self.main_window.file_manager.set_tab_modified(container, True)
+            self.add_replaced([(path, len(replacements))])
+
+    def stop(self):
+        if self.job:
+            self.job.cancelled = True
+            self.job = None
+        if self.panel:
+            self.panel.stop_button.setEnabled(False)
+
+    def add_results(self, results):
+        job = self.job
+        tree = self.panel.results
+        tree.setUpdatesEnabled(False)
+        items = []
+        for path, hits in results:
+            item = QTreeWidgetItem([os.path.relpath(path, job.root), str(len(hits))])
+            item.setData(0, Qt.UserRole, (path, 1))
+            for line_number, line in hits:
+                child = QTreeWidgetItem([str(line_number), line])
+                child.setData(0, Qt.UserRole, (path, line_number))
+                item.addChild(child)
+            items.append(item)
+            job.files += 1
+            job.hits += len(hits)
+        tree.addTopLevelItems(items)
+        tree.setUpdatesEnabled(True)
+
+    def add_replaced(self, results):
+        job = self.job
+        items = []
+        for path, count in results:
+            item = QTreeWidgetItem([os.path.relpath(path, job.root), str(count)])
+            item.setData(0, Qt.UserRole, (path, 1))
+            items.append(item)
+            job.files += 1
+            job.hits += count
+        self.panel.results.addTopLevelItems(items)
+
+    @pyqtSlot(object, object)
+    def on_results(self, job, results):
+        if job is not self.job:
+            return
+        if job.mode is replace_files:
+            replaced, errors = results
+            job.errors += len(errors)
+            self.add_replaced(replaced)
+        else:
+            self.add_results(results)
+
+    @pyqtSlot(object, int)
+    def on_finished(self, job, scanned):
+        if job is not self.job:
+            return
+        self.job = None
+        self.panel.stop_button.setEnabled(False)
+        if job.mode is replace_files:
+            text = self.translate("replace_in_files_done").format(job.hits, job.files)
+            if job.errors:
+                text += " " + self.translate("replace_in_files_failed").format(job.errors)
+        else:
+            text = self.translate("search_results").format(job.hits, job.files, scanned)
+        self.panel.status_label.setText(text)
+
+    @pyqtSlot(object, str)
+    def on_failed(self, job, error):
+        if job is not self.job:
+            return
+        self.job = None
+        self.panel.stop_button.setEnabled(False)
+        self.panel.status_label.setText(f"{self.translate('error')}: {error}")
+
+    def open_hit(self, item):
+        target = item.data(0, Qt.UserRole)
+        if target:
+            path, line_number = target
+            self.main_window.file_manager.open_path(path, line_number)
@@ -0,0 +1,115 @@
+import bisect
+import re
+
+# Same fence rules as the block renderer and the same heading rules as
+# Python-Markdown, so the outline agrees with the preview.
+FENCE_OPEN_RE = re.compile(r'^(`{3,}|~{3,})')
+ATX_HEADING_RE = re.compile(r'^(#{1,6})(.*?)#*$')
+SETEXT_UNDERLINE_RE = re.compile(r'^(=+|-+)[ \t]*$')
+
+FENCE = 0
+HEADING = 1
+UNDERLINE = 2
+
+
+def classify(text):
+    # The part of a line the outline cares about, judged on the line alone.
+    if text[:1] in ("`", "~"):
+        match = FENCE_OPEN_RE.match(text)
+        if match:
+            return (FENCE, match.group(1), text.rstrip())
+    if text[:1] == "#":
+        match = ATX_HEADING_RE.match(text)
+        return (HEADING, len(match.group(1)), match.group(2).strip())
+    if text[:1] in ("=", "-"):
+        match = SETEXT_UNDERLINE_RE.match(text)
+        if match:
+            return (UNDERLINE, 1 if match.group(1)[0] == "=" else 2, None)
+    return None
+
+
+class HeadingIndex:
+    # Block numbers of the lines that can affect the outline (headings,
+    # setext underlines and code fences), kept sorted. An edit rescans only
+    # the blocks it touched and shifts the entries behind them; the outline
+    # itself is derived from these few entries when it is asked for.
+    def __init__(self, document):
+        self.document = document
+        self.numbers = []
+        self.entries = []
+        self.block_count = 0
+        self.cached = None
+        self.rescan()
+        document.contentsChange.connect(self.on_contents_change)
+
+    def rescan(self):
+        self.numbers = []
+        self.entries = []
+        block = self.document.begin()
+        while block.isValid():
+            entry = classify(block.text())
+            if entry is not None:
+                self.numbers.append(block.blockNumber())
+                self.entries.append(entry)
+            block = block.next()
+        self.block_count = self.document.blockCount()
+        self.cached = None
+
+    def on_contents_change(self, position, removed, added):
+        document = self.document
+        first = document.findBlock(position).blockNumber()
+        last = document.findBlock(min(position + added, document.characterCount() - 1)).blockNumber()
+        delta = document.blockCount() - self.block_count
+        # Blocks first..old_last of the previous text became first..last.
+        old_last = last - delta
+        if first < 0 or old_last < first or old_last >= self.block_count:
+            self.rescan()
+            return
+
+        numbers = []
+        entries = []
+        block = document.findBlockByNumber(first)
+        for number in range(first, last + 1):
+            entry = classify(block.text())
+            if entry is not None:
+                numbers.append(number)
+                entries.append(entry)
+            block = block.next()
+
+        low = bisect.bisect_left(self.numbers, first)
+        high = bisect.bisect_right(self.numbers, old_last)
+        if low == high and not entries and not delta:
+            # Typing inside an ordinary line; the outline is unchanged
+            # unless the line sits above a setext underline.
+            if self.numbers[low:low + 1] != [last + 1]:
+                return
+        self.numbers[low:] = numbers + [number + delta for number in self.numbers[high:]]
+        self.entries[low:] = entries + self.entries[high:]
+        self.block_count = document.blockCount()
+        self.cached = None
+
+    def headings(self):
+        # (block number, level, title) of every heading outside fenced code.
+        if self.cached is not None:
+            return self.cached
+        headings = []
+        fence = None
+        previous_number = -1
+        for number, entry in zip(self.numbers, self.entries):
+            kind = entry[0]
+            if fence is not None:
+                if kind == FENCE and entry[2] == fence:
+                    fence = None
+            elif kind == FENCE:
+                fence = entry[1]
+            elif kind == HEADING:
+                headings.append((number, entry[1], entry[2]))
+            elif number > 0 and previous_number != number - 1:
+                # An underline makes the line above a heading, unless that
+                # line is blank or itself a heading, fence or underline.
+                title = self.document.findBlockByNumber(number - 1).text().strip()
+                if title:
+                    headings.append((number - 1, entry[1], title))
+            previous_number = number
+        self.cached = headings
+        return headings
@@ -0,0 +1,204 @@
+import argparse
+import base64
+import mimetypes
+import os
+import re
+import sys
+import time
+from functools import lru_cache
+from urllib.parse import unquote, urlparse
+
+import math_renderer
+from preview_styles import preview_stylesheet
+from project_search import iter_markdown_files, read_text
+from render_engine import render_markdown
+from utils import atomic_write
+
+# Kept free of Qt so exports run on machines without a display:
+#
+#   hel-markdown export [--jobs N] [--theme light|dark] [--minify] [--embed-images] src/ out/
+
+# Pieces of the page handed to the file at a time.
+WRITE_CHUNK = 1024 * 1024
+MAX_EMBED_BYTES = 10 * 1024 * 1024
+IMG_SRC_RE = re.compile(r'(<img\b[^>]*?\bsrc=)(["\'])(.*?)\2', re.IGNORECASE | re.DOTALL)
+MATH_IMG_RE = re.compile(rf'<img\b[^>]*\bclass="{math_renderer.MATH_CLASS}"[^>]*>', re.IGNORECASE)
+# Whitespace inside these is content.
+PRESERVE_RE = re.compile(r"<(pre|textarea|script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+WHITESPACE_RE = re.compile(r"\s+")
+BLOCK_TAGS = "html|head|body|meta|title|style|p|div|h[1-6]|ul|ol|li|dl|dt|dd|table|thead|tbody|tr|th|td|blockquote|pre|hr|br|section"
+BETWEEN_BLOCKS_RE = re.compile(rf"(</?(?:{BLOCK_TAGS})\b[^>]*>)\s+(?=</?(?:{BLOCK_TAGS})\b)", re.IGNORECASE)
+CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+CSS_PUNCTUATION_RE = re.compile(r"\s*([{};,])\s*")
+
+
+def html_page(body, css, title=""):
+    return "".join(page_chunks(body, css, title))
+
+
+def page_chunks(body, css, title=""):
+    yield (
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+        f"<title>{escape_title(title)}</title>\n<style>{css}</style>\n</head>\n<body>\n"
+    )
+    for start in range(0, len(body), WRITE_CHUNK):
+        yield body[start:start + WRITE_CHUNK]
+    yield "\n</body>\n</html>\n"
+
+
+def render_page(text, css, title="", base_dir=None, minify=False, embed_images=False):
+    # The editor and the command line export through here; returns the
+    # page in pieces for atomic_write.
+    body = render_markdown(text)
+    if embed_images:
+        body = embed_local_images(body, base_dir or os.getcwd())
+    else:
+        # Formula images live in this user's cache, so they always travel
+        # inside the page.
+        body = MATH_IMG_RE.sub(lambda match: embed_local_images(match.group(0), os.getcwd()), body)
+    if minify:
+        body = minify_html(body)
+        css = minify_css(css)
+    return page_chunks(body, css, title)
+
+
+def minify_html(html):
+    parts = []
+    position = 0
+    for match in PRESERVE_RE.finditer(html):
+        parts.append(collapse_whitespace(html[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(collapse_whitespace(html[position:]))
+    return "".join(parts)
+
+
+def collapse_whitespace(html):
+    # Between inline elements a single space is still significant, so only
+    # whitespace between block tags is dropped entirely.
+    return BETWEEN_BLOCKS_RE.sub(r"\1", WHITESPACE_RE.sub(" ", html))
+
+
+def minify_css(css):
+    css = CSS_COMMENT_RE.sub("", css)
+    css = WHITESPACE_RE.sub(" ", css)
+    css = CSS_PUNCTUATION_RE.sub(r"\1", css)
+    return css.replace(": ", ":").replace(";}", "}").strip()
+
+
+def embed_local_images(html, base_dir):
+    def replace(match):
+        data_uri = local_image_uri(match.group(3), base_dir)
+        if data_uri is None:
+            return match.group(0)
+        return f"{match.group(1)}{match.group(2)}{data_uri}{match.group(2)}"
+    return IMG_SRC_RE.sub(replace, html)
+
+
+def local_image_uri(src, base_dir):
+    url = urlparse(src)
+    if url.scheme not in ("", "file") or (url.scheme == "" and url.netloc):
+        return None
+    path = unquote(url.path)
+    path = os.path.realpath(os.path.join(base_dir, path))
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if stat.st_size > MAX_EMBED_BYTES:
+        return None
+    return image_data_uri(path, stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=256)
+def image_data_uri(path, mtime_ns, size):
+    # Keyed on the file's identity, so an image used many times (or by many
+    # documents in one export) is read and encoded once.
+    mime_type = mimetypes.guess_type(path)[0]
+    if not mime_type or not mime_type.startswith("image/"):
+        return None
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    return f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def escape_title(title):
+    return title.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def export_file(source, target, dark=False, minify=False, embed_images=False):
+    text = read_text(source).replace("\r\n", "\n")
+    title = os.path.splitext(os.path.basename(source))[0]
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    # Runs in its own process (or the command line's), so the theme for
+    # formula images can be set globally.
+    math_renderer.set_dark(dark)
+    atomic_write(target, render_page(text, preview_stylesheet(dark), title, os.path.dirname(os.path.abspath(source)), minify, embed_images))
+
+
+def export_one(job):
+    source, target, options = job
+    try:
+        export_file(source, target, *options)
+    except (OSError, UnicodeDecodeError) as e:
+        return source, str(e)
+    return source, None
+
+
+def export_jobs(source, output, options):
+    if os.path.isfile(source):
+        target = output
+        if os.path.isdir(output) or output.endswith(os.sep):
+            target = os.path.join(output, os.path.splitext(os.path.basename(source))[0] + ".html")
+        return [(source, target, options)]
+    jobs = []
+    for path in iter_markdown_files(source):
+        relative = os.path.splitext(os.path.relpath(path, source))[0] + ".html"
+        jobs.append((path, os.path.join(output, relative), options))
+    return jobs
+
+
+def export_all(jobs, workers):
+    failures = []
+    if workers <= 1 or len(jobs) <= 1:
+        results = map(export_one, jobs)
+        failures = [(source, error) for source, error in results if error]
+        return failures
+    from concurrent.futures import ProcessPoolExecutor
+    # Every worker keeps its own Markdown instance, so handing out files in
+    # chunks amortises the set-up across many documents.
+    chunksize = max(1, len(jobs) // (workers * 8))
+    with ProcessPoolExecutor(workers) as executor:
+        for source, error in executor.map(export_one, jobs, chunksize=chunksize):
+            if error:
+                failures.append((source, error))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="hel-markdown export", description="Render Markdown files to standalone HTML.")
+    parser.add_argument("source", help="Markdown file or folder")
+    parser.add_argument("output", help="HTML file or output folder")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="worker processes (default: all cores)")
+    parser.add_argument("--theme", choices=("light", "dark"), default="light")
+    parser.add_argument("--minify", action="store_true", help="strip insignificant whitespace from HTML and CSS")
+    parser.add_argument("--embed-images", action="store_true", help="inline local images as data URIs")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.source):
+        parser.error(f"{args.source} does not exist")
+    start = time.perf_counter()
+    jobs = export_jobs(args.source, args.output, (args.theme == "dark", args.minify, args.embed_images))
+    failures = export_all(jobs, max(1, args.jobs))
+    for source, error in failures:
+        print(f"{source}: {error}", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    print(f"Exported {len(jobs) - len(failures)} of {len(jobs)} file(s) in {elapsed:.2f}s")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import os
+from collections import OrderedDict
+
+from PyQt5.QtCore import QObject, QRunnable, QSize, QThreadPool, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QColor, QImage, QImageReader
+
+from preview_styles import IMAGE_MAX_WIDTH
+from utils import cache_home
+
+# Scaled images kept for the previews of all tabs, bounded by their pixel
+# data rather than by count.
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+MAX_DECODE_THREADS = 2
+PLACEHOLDER_SIZE = QSize(IMAGE_MAX_WIDTH, IMAGE_MAX_WIDTH * 3 // 4)
+PLACEHOLDER_COLOR = QColor(128, 128, 128, 48)
+
+
+def image_key(path, width):
+    # None for files that cannot be read; an edited image gets a new key.
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (path, stat.st_mtime_ns, stat.st_size, width)
+
+
+def decode_image(path, width):
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    size = reader.size()
+    # Formulas and other images the app draws itself keep their size.
+    if size.isValid() and size.width() > width and not path.startswith(cache_home() + os.sep):
+        # Formats that support it (JPEG above all) decode straight to the
+        # smaller size instead of decoding every pixel first.
+        reader.setScaledSize(QSize(width, max(1, size.height() * width // size.width())))
+    image = reader.read()
+    if image.isNull():
+        return None
+    return image
+
+
+def image_cost(image):
+    return image.bytesPerLine() * image.height()
+
+
+class ImageCache:
+    # Only used from the UI thread; the decode tasks hand their results
+    # back through a signal.
+    def __init__(self, max_bytes=MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+
+    def get(self, key):
+        image = self.entries.get(key)
+        if image is not None:
+            self.entries.move_to_end(key)
+        return image
+
+    def put(self, key, image):
+        cost = image_cost(image)
+        if cost > self.max_bytes:
+            return
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.size -= image_cost(previous)
+        self.entries[key] = image
+        self.size += cost
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= image_cost(evicted)
+
+
+class DecodeSignals(QObject):
+    finished = pyqtSignal(object, object)
+
+
+class DecodeTask(QRunnable):
+    def __init__(self, key, signals):
+        super().__init__()
+        self.key = key
+        self.signals = signals
+
+    def run(self):
+        path, _, _, width = self.key
+        try:
+            image = decode_image(path, width)
+        except Exception:
+            image = None
+        self.signals.finished.emit(self.key, image)
+
+
+class ImageLoader(QObject):
+    # Shared by the previews of all tabs, so an image shown in several
+    # documents is decoded once.
+    loaded = pyqtSignal(object, object)
+
+    def __init__(self, main_window):
+        super().__init__(main_window)
+        self.main_window = main_window
+        self.cache = ImageCache()
+        self.pending = set()
+        # Keys that failed to decode, so broken files are not retried on
+        # every update; a changed file gets a new key.
+        self.failed = set()
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(MAX_DECODE_THREADS)
+        self.signals = DecodeSignals()
+        self.signals.finished.connect(self.on_decode_finished)
+
+        placeholder = QImage(PLACEHOLDER_SIZE, QImage.Format_ARGB32_Premultiplied)
+        placeholder.fill(PLACEHOLDER_COLOR)
+        self.placeholder = placeholder
+
+    def image(self, key):
+        # The scaled image, the placeholder while it is being decoded, or
+        # None if it cannot be decoded.
+        image = self.cache.get(key)
+        if image is not None:
+            return image
+        if key in self.failed:
+            return None
+        if key not in self.pending:
+            self.pending.add(key)
+            self.pool.start(DecodeTask(key, self.signals))
+        return self.placeholder
+
+    @pyqtSlot(object, object)
+    def on_decode_finished(self, key, image):
+        self.pending.discard(key)
+        if image is None:
+            self.failed.add(key)
+        else:
+            self.cache.put(key, image)
+        self.loaded.emit(key, image)
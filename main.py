@@ -1,12 +1,31 @@
 #!/usr/bin/env python3
 import sys
-from PyQt5.QtWidgets import QApplication
-from editor import MarkdownEditor
+import time
 
 def main():
+    started_at = time.perf_counter()
+    # "export" runs headless; Qt is only imported for the editor.
+    if len(sys.argv) > 1 and sys.argv[1] == "export":
+        from html_export import main as export_main
+        sys.exit(export_main(sys.argv[2:]))
+
+    import startup_profile
+    if "--startup-profile" in sys.argv:
+        sys.argv.remove("--startup-profile")
+        startup_profile.enable(started_at)
+
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+    startup_profile.mark("import PyQt5")
+    from editor import MarkdownEditor
+    startup_profile.mark("import editor")
+
     app = QApplication(sys.argv)
+    startup_profile.mark("QApplication created")
     window = MarkdownEditor()
     window.showMinimized()
+    startup_profile.mark("window shown")
+    QTimer.singleShot(0, lambda: startup_profile.mark("event loop running"))
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
@@ -0,0 +1,193 @@
+import re
+
+from PyQt5.QtCore import QPoint, QTimer
+from PyQt5.QtGui import QColor, QFont, QSyntaxHighlighter, QTextCharFormat
+
+from utils import utf16_len
+
+# Blocks further than this from the visible ones only have their fence
+# state tracked; their colours are filled in when they scroll into view.
+VIEWPORT_MARGIN_BLOCKS = 50
+# Block state: 0 outside fenced code, otherwise the opening fence (its
+# length and character) so that only a matching fence closes it. DEFERRED
+# is added for blocks whose formatting was skipped.
+DEFERRED = 1 << 20
+
+FENCE_RE = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+HEADING_RE = re.compile(r'^ {0,3}#{1,6}(?:[ \t]|$)')
+BLOCKQUOTE_RE = re.compile(r'^ {0,3}>')
+HORIZONTAL_RULE_RE = re.compile(r'^ {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$')
+LIST_MARKER_RE = re.compile(r'^[ \t]*(?:[*+-]|\d+[.)])(?:[ \t]+\[[ xX]\])?(?=[ \t]|$)')
+TABLE_SEPARATOR_RE = re.compile(r'^[ \t]*\|?[ \t]*:?-+:?[ \t]*(?:\|[ \t]*:?-+:?[ \t]*)+\|?[ \t]*$')
+TABLE_PIPE_RE = re.compile(r'(?<!\\)\|')
+CODE_SPAN_RE = re.compile(r'(`+)(?!`).+?(?<!`)\1(?!`)')
+STRONG_RE = re.compile(r'(\*\*|__)(?=\S).+?(?<=\S)\1')
+EMPHASIS_RE = re.compile(r'(?<![*\w])\*(?=[^\s*]).*?(?<=[^\s*])\*(?!\*)|(?<![_\w])_(?=[^\s_]).*?(?<=[^\s_])_(?![_\w])')
+STRIKETHROUGH_RE = re.compile(r'~~(?=\S).+?(?<=\S)~~')
+LINK_RE = re.compile(r'!?\[[^\]]*\]\([^)]*\)|!?\[[^\]]*\]\[[^\]]*\]|<(?:https?|ftp|mailto):[^>\s]+>')
+ASTRAL_RE = re.compile('[\U00010000-\U0010FFFF]')
+INLINE_PATTERNS = (
+    (LINK_RE, "link"),
+    (STRONG_RE, "strong"),
+    (EMPHASIS_RE, "emphasis"),
+    (STRIKETHROUGH_RE, "strikethrough"),
+    (CODE_SPAN_RE, "code"),
+)
+MERGED_FORMATS = ("strong", "emphasis", "strikethrough")
+
+PALETTES = {
+    False: {"heading": "#1f4e99", "code": "#a0522d", "link": "#0b6e99", "quote": "#6a737d", "marker": "#b35900", "table": "#8a8a8a"},
+    True: {"heading": "#7cb7ff", "code": "#e6b673", "link": "#56c4e8", "quote": "#9aa5b1", "marker": "#ffab5e", "table": "#9a9a9a"},
+}
+
+
+def fence_state(fence):
+    # Capped well below DEFERRED; a longer fence still closes on any fence
+    # of at least this length.
+    return min(len(fence), 0xFFFF) << 1 | (fence[0] == "~")
+
+
+def char_format(color=None, bold=False, italic=False, strike=False):
+    text_format = QTextCharFormat()
+    if color:
+        text_format.setForeground(QColor(color))
+    if bold:
+        text_format.setFontWeight(QFont.Bold)
+    if italic:
+        text_format.setFontItalic(True)
+    if strike:
+        text_format.setFontStrikeOut(True)
+    return text_format
+
+
+class MarkdownHighlighter(QSyntaxHighlighter):
+    # Qt calls highlightBlock for the edited blocks and keeps going while a
+    # block's state differs from last time, so an edit that opens or closes
+    # a fence restyles what follows and anything else stops at once.
+    def __init__(self, editor, dark=False):
+        super().__init__(editor.document())
+        self.editor = editor
+        self.first_visible = 0
+        self.last_visible = 0
+        self.set_palette(dark)
+        self.update_visible_range()
+        self.restyle(self.rehighlight)
+
+        # Coalesces scrolling and resizing, and keeps restyling out of the
+        # middle of an edit's layout pass.
+        self.scroll_timer = QTimer(self)
+        self.scroll_timer.setSingleShot(True)
+        self.scroll_timer.setInterval(0)
+        self.scroll_timer.timeout.connect(self.highlight_visible)
+        editor.verticalScrollBar().valueChanged.connect(self.schedule_visible)
+        editor.verticalScrollBar().rangeChanged.connect(self.schedule_visible)
+
+    def set_palette(self, dark):
+        colors = PALETTES[dark]
+        self.formats = {
+            "heading": char_format(colors["heading"], bold=True),
+            "code": char_format(colors["code"]),
+            "link": char_format(colors["link"]),
+            "quote": char_format(colors["quote"], italic=True),
+            "marker": char_format(colors["marker"], bold=True),
+            "table": char_format(colors["table"]),
+            "strong": char_format(bold=True),
+            "emphasis": char_format(italic=True),
+            "strikethrough": char_format(strike=True),
+        }
+
+    def set_dark(self, dark):
+        self.set_palette(dark)
+        self.restyle(self.rehighlight)
+
+    def restyle(self, function, *args):
+        # Formatting alone still makes the editor emit textChanged, which
+        # would mark the tab modified and schedule a render.
+        self.editor.blockSignals(True)
+        try:
+            function(*args)
+        finally:
+            self.editor.blockSignals(False)
+
+    def update_visible_range(self):
+        viewport = self.editor.viewport()
+        self.first_visible = self.editor.cursorForPosition(QPoint(0, 0)).block().blockNumber()
+        self.last_visible = self.editor.cursorForPosition(QPoint(viewport.width(), viewport.height())).block().blockNumber()
+
+    def schedule_visible(self, *args):
+        self.scroll_timer.start()
+
+    def highlight_visible(self):
+        self.update_visible_range()
+        block = self.document().findBlockByNumber(max(0, self.first_visible - VIEWPORT_MARGIN_BLOCKS))
+        last = self.last_visible + VIEWPORT_MARGIN_BLOCKS
+        while block.isValid() and block.blockNumber() <= last:
+            if block.userState() != -1 and block.userState() & DEFERRED:
+                # Also restyles the following deferred blocks, as their
+                # state changes in turn.
+                self.restyle(self.rehighlightBlock, block)
+            block = block.next()
+
+    def is_near_viewport(self):
+        number = self.currentBlock().blockNumber()
+        return self.first_visible - VIEWPORT_MARGIN_BLOCKS <= number <= self.last_visible + VIEWPORT_MARGIN_BLOCKS
+
+    def highlightBlock(self, text):
+        previous = self.previousBlockState()
+        fence = previous & ~DEFERRED if previous != -1 else 0
+        fence_match = FENCE_RE.match(text)
+        if fence:
+            closing = fence_match.group(1) if fence_match else ""
+            closes = closing[:1] == ("~" if fence & 1 else "`") and len(closing) >= fence >> 1 \
+                and not text[fence_match.end():].strip()
+            state = 0 if closes else fence
+        else:
+            state = fence_state(fence_match.group(1)) if fence_match else 0
+
+        if not self.is_near_viewport():
+            self.setCurrentBlockState(state | DEFERRED)
+            return
+        self.setCurrentBlockState(state)
+        if fence or fence_match:
+            self.apply(text, [(0, len(text), "code")])
+            return
+        self.apply(text, self.block_spans(text))
+
+    def block_spans(self, text):
+        if HEADING_RE.match(text):
+            return [(0, len(text), "heading")]
+        if HORIZONTAL_RULE_RE.match(text):
+            return [(0, len(text), "marker")]
+        spans = []
+        if BLOCKQUOTE_RE.match(text):
+            spans.append((0, len(text), "quote"))
+        marker = LIST_MARKER_RE.match(text)
+        if marker:
+            spans.append((0, marker.end(), "marker"))
+        if "|" in text:
+            if TABLE_SEPARATOR_RE.match(text):
+                spans.append((0, len(text), "table"))
+            else:
+                spans.extend((match.start(), match.end(), "table") for match in TABLE_PIPE_RE.finditer(text))
+        # Later spans win, so code spans come last and hide any emphasis
+        # markers inside them.
+        for pattern, name in INLINE_PATTERNS:
+            if name == "code" and "`" not in text:
+                continue
+            spans.extend((match.start(), match.end(), name) for match in pattern.finditer(text))
+        return spans
+
+    def apply(self, text, spans):
+        # setFormat counts UTF-16 units; only text with characters outside
+        # the BMP needs its offsets converted.
+        astral = ASTRAL_RE.search(text) is not None
+        for start, end, name in spans:
+            if astral:
+                start, end = utf16_len(text[:start]), utf16_len(text[:end])
+            text_format = self.formats[name]
+            if name in MERGED_FORMATS:
+                # Keeps the colour the span already has, e.g. inside a quote.
+                merged = QTextCharFormat(self.format(start))
+                merged.merge(text_format)
+                text_format = merged
+            self.setFormat(start, end - start, text_format)
@@ -0,0 +1,196 @@
+import bisect
+
+from PyQt5.QtCore import QObject, QRunnable, QTimer, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QTextCursor
+
+from utils import utf16_offsets
+
+# A background scan goes through the text in chunks of about this many
+# characters, ending at a line break, and stops between chunks once it has
+# been superseded. Matches starting in a chunk are looked for in this much
+# more text, so that ones running on past its end are found whole.
+SCAN_CHUNK_CHARS = 64 * 1024
+SCAN_OVERLAP_CHARS = 4096
+# Regex tokens that can match a line break. Patterns using them are checked
+# by a full background scan once editing pauses, on top of the line rescan.
+MULTILINE_RESCAN_MS = 300
+MULTILINE_TOKENS = ("\\n", "\\s", "\\S", "\\W", "\\D", "\\Z", "[^", "(?s", "\\x0a", "\\x0A", "\\012", "\\u000a", "\\u000A")
+
+
+def line_end(text, position):
+    end = text.find("\n", position)
+    return len(text) if end == -1 else end
+
+
+class ScanSignals(QObject):
+    finished = pyqtSignal(int, object)
+
+
+class ScanTask(QRunnable):
+    def __init__(self, index, generation, pattern, text, signals):
+        super().__init__()
+        self.index = index
+        self.generation = generation
+        self.pattern = pattern
+        self.text = text
+        self.signals = signals
+
+    def run(self):
+        text = self.text
+        offsets = []
+        start = 0
+        while start < len(text):
+            if self.index.generation != self.generation:
+                return
+            end = line_end(text, start + SCAN_CHUNK_CHARS)
+            search_end = line_end(text, end + SCAN_OVERLAP_CHARS)
+            # Searching from start still lets anchors and word boundaries see
+            # the text in front of the chunk.
+            next_start = end
+            for match in self.pattern.finditer(text, start, search_end):
+                if match.start() >= end:
+                    break
+                if match.end() == search_end < len(text):
+                    match = self.pattern.match(text, match.start()) or match
+                if match.end() > match.start():
+                    offsets.append(match.start())
+                    offsets.append(match.end())
+                next_start = max(end, match.end())
+            start = next_start
+        if self.index.generation != self.generation:
+            return
+        positions = utf16_offsets(text, offsets)
+        self.signals.finished.emit(self.generation, list(zip(positions[0::2], positions[1::2])))
+
+
+class MatchIndex(QObject):
+    # Sorted (start, end) UTF-16 positions of every match of one pattern in
+    # one document. The first pass runs in the background; after that each
+    # edit only rescans the lines it touched and shifts the matches behind it.
+    changed = pyqtSignal()
+
+    def __init__(self, document, pool, parent=None):
+        super().__init__(parent)
+        self.document = document
+        self.pool = pool
+        self.pattern = None
+        self.multiline = False
+        self.matches = []
+        self.ready = False
+        self.generation = 0
+        self.length = document.characterCount() - 1
+
+        self.signals = ScanSignals()
+        self.signals.finished.connect(self.on_scan_finished)
+        document.contentsChange.connect(self.on_contents_change)
+
+        self.rescan_timer = QTimer(self)
+        self.rescan_timer.setSingleShot(True)
+        self.rescan_timer.setInterval(MULTILINE_RESCAN_MS)
+        self.rescan_timer.timeout.connect(self.scan)
+
+    def set_pattern(self, pattern):
+        self.pattern = pattern
+        self.matches = []
+        self.ready = False
+        if pattern is None:
+            self.rescan_timer.stop()
+            self.generation += 1
+            self.changed.emit()
+            return
+        self.multiline = any(token in pattern.pattern for token in MULTILINE_TOKENS)
+        self.scan()
+
+    def scan(self):
+        self.rescan_timer.stop()
+        self.generation += 1
+        self.pool.start(ScanTask(self, self.generation, self.pattern, self.document.toPlainText(), self.signals))
+
+    def load(self, pattern, matches):
+        # Matches found by the caller for the current text.
+        self.rescan_timer.stop()
+        self.generation += 1
+        self.pattern = pattern
+        self.multiline = any(token in pattern.pattern for token in MULTILINE_TOKENS)
+        self.matches = matches
+        self.ready = True
+        self.changed.emit()
+
+    @pyqtSlot(int, object)
+    def on_scan_finished(self, generation, matches):
+        if generation != self.generation:
+            return
+        self.matches = matches
+        self.ready = True
+        self.changed.emit()
+
+    def on_contents_change(self, position, removed, added):
+        length = self.document.characterCount() - 1
+        delta = length - self.length
+        self.length = length
+        if self.pattern is None:
+            return
+        if not self.ready:
+            # The running scan already has stale text; start over.
+            self.scan()
+            return
+
+        # Rescan whole lines, so anchors and word boundaries see the same
+        # context a full scan would.
+        window_start = self.document.findBlock(position).position()
+        last_block = self.document.findBlock(min(position + added, length))
+        window_end = last_block.position() + last_block.length() - 1
+        old_window_end = window_end - delta
+
+        low = bisect.bisect_left(self.matches, (window_start, 0))
+        # A match in front of the window that ran into it is rescanned too.
+        while low > 0 and self.matches[low - 1][1] > window_start:
+            low -= 1
+        if low < len(self.matches) and self.matches[low][0] < window_start:
+            window_start = self.document.findBlock(self.matches[low][0]).position()
+        high = bisect.bisect_left(self.matches, (old_window_end, 0))
+
+        cursor = QTextCursor(self.document)
+        cursor.setPosition(window_start)
+        cursor.setPosition(window_end, QTextCursor.KeepAnchor)
+        text = cursor.selectedText().replace("\u2029", "\n")
+        offsets = []
+        for match in self.pattern.finditer(text):
+            if match.end() > match.start():
+                offsets.append(match.start())
+                offsets.append(match.end())
+        positions = [window_start + offset for offset in utf16_offsets(text, offsets)]
+
+        tail = [(start + delta, end + delta) for start, end in self.matches[high:]]
+        self.matches = self.matches[:low] + list(zip(positions[0::2], positions[1::2])) + tail
+        if self.multiline:
+            self.rescan_timer.start()
+        self.changed.emit()
+
+    def match_at(self, start, end):
+        index = bisect.bisect_left(self.matches, (start, end))
+        if index < len(self.matches) and self.matches[index] == (start, end):
+            return index
+        return -1
+
+    def next_match(self, position):
+        if not self.matches:
+            return -1
+        return bisect.bisect_left(self.matches, (position, 0)) % len(self.matches)
+
+    def previous_match(self, position):
+        if not self.matches:
+            return -1
+        return (bisect.bisect_left(self.matches, (position, 0)) - 1) % len(self.matches)
+
+    def visible(self, start, end):
+        low = bisect.bisect_left(self.matches, (start, 0))
+        while low > 0 and self.matches[low - 1][1] > start:
+            low -= 1
+        high = bisect.bisect_right(self.matches, (end, end))
+        return self.matches[low:high]
+
+    def detach(self):
+        self.rescan_timer.stop()
+        self.generation += 1
+        self.document.contentsChange.disconnect(self.on_contents_change)
@@ -0,0 +1,36 @@
+import xml.etree.ElementTree as etree
+from pathlib import Path
+
+from markdown.extensions import Extension
+from markdown.inlinepatterns import InlineProcessor
+from markdown.util import AtomicString
+
+from math_renderer import MATH_CLASS, formula_image
+
+# $...$ inline and $$...$$ display formulas. The content may not start or
+# end with a space or hold an unescaped $, and a closing $ may not be
+# followed by a digit, so prices such as "$5 and $10" stay text.
+MATH_RE = r'(?<![\\$])(\$\$?)(?![\s$])((?:\\.|[^\\$])+?)(?<![\s\\])\1(?![$\d])'
+
+
+class MathInlineProcessor(InlineProcessor):
+    def handleMatch(self, m, data):
+        tex = m.group(2).strip()
+        display = m.group(1) == "$$"
+        path = formula_image(tex, display)
+        if path is None:
+            element = etree.Element("code")
+            element.text = AtomicString(m.group(0))
+        else:
+            element = etree.Element("img")
+            element.set("src", Path(path).as_uri())
+            element.set("alt", tex)
+        element.set("class", MATH_CLASS)
+        return element, m.start(0), m.end(0)
+
+
+class MathExtension(Extension):
+    def extendMarkdown(self, md):
+        # After code spans (190), so `$x$` stays code, and before backslash
+        # escapes (180), which would eat TeX's \{ and \_.
+        md.inlinePatterns.register(MathInlineProcessor(MATH_RE, md), "math", 185)
@@ -0,0 +1,117 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from utils import cache_home
+
+# Free of Qt and Markdown, so the block cache and the exporter can use it
+# without pulling either onto the startup path; the Markdown side lives in
+# math_extension, which only build_markdown imports.
+MATH_CLASS = "math"
+DPI = 100
+FONT_SIZE = 12
+DISPLAY_FONT_SIZE = 15
+COLORS = {False: "#000000", True: "#f0f0f0"}
+# Formula -> image path (None for formulas that failed), most recent last.
+MAX_MEMORY_ENTRIES = 2048
+
+_dark = False
+_memory = OrderedDict()
+_lock = threading.Lock()
+# matplotlib keeps global font and parser state, so one formula is drawn
+# at a time.
+_render_lock = threading.Lock()
+_mathtext = None
+
+
+def set_dark(dark):
+    global _dark
+    _dark = dark
+
+
+def cache_variant(source):
+    # Part of the preview's block cache key, so blocks with formulas are
+    # rendered again with the other colours after a theme switch.
+    if "$" not in source:
+        return ""
+    return "dark" if _dark else "light"
+
+
+def cache_dir():
+    return os.path.join(cache_home(), "math")
+
+
+def load_mathtext():
+    # matplotlib is slow to import, so it is looked up on the first
+    # formula. The package depends on it; a source checkout without it
+    # shows formulas as TeX source.
+    global _mathtext
+    if _mathtext is None:
+        try:
+            from matplotlib import mathtext
+            from matplotlib.font_manager import FontProperties
+            _mathtext = (mathtext, FontProperties)
+        except ImportError:
+            _mathtext = False
+    return _mathtext
+
+
+def formula_image(tex, display):
+    dark = _dark
+    digest = hashlib.sha1(f"{tex}\0{display}\0{dark}\0{DPI}".encode("utf-8", "surrogatepass")).hexdigest()
+    with _lock:
+        if digest in _memory:
+            _memory.move_to_end(digest)
+            return _memory[digest]
+
+    path = os.path.join(cache_dir(), f"{digest}.png")
+    if not os.path.exists(path):
+        try:
+            data = draw_formula(tex, display, dark)
+        except Exception:
+            data = None
+        if data is None:
+            path = None
+        else:
+            try:
+                write_cache_file(path, data)
+            except OSError:
+                path = None
+
+    with _lock:
+        _memory[digest] = path
+        if len(_memory) > MAX_MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+    return path
+
+
+def draw_formula(tex, display, dark):
+    loaded = load_mathtext()
+    if not loaded:
+        return None
+    mathtext, FontProperties = loaded
+    buffer = io.BytesIO()
+    prop = FontProperties(size=DISPLAY_FONT_SIZE if display else FONT_SIZE)
+    with _render_lock:
+        mathtext.math_to_image(f"${tex}$", buffer, prop=prop, dpi=DPI, format="png", color=COLORS[dark])
+    return buffer.getvalue()
+
+
+def write_cache_file(path, data):
+    # Renamed into place so a concurrent reader never sees half a PNG.
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,156 @@
+from PyQt5.QtCore import QObject, Qt, QTimer
+from PyQt5.QtWidgets import QDockWidget, QLineEdit, QTreeWidget, QTreeWidgetItem, QVBoxLayout, QWidget
+
+from heading_index import HeadingIndex
+from translations import translations
+
+# Edits are collected for this long before the panel looks at the index.
+REFRESH_DELAY_MS = 200
+
+
+class OutlinePanel(QDockWidget):
+    def __init__(self, parent=None, current_language="en"):
+        super().__init__(parent)
+        self.setObjectName("outline")
+
+        self.filter_input = QLineEdit()
+        self.filter_input.setClearButtonEnabled(True)
+        self.tree = QTreeWidget()
+        self.tree.setHeaderHidden(True)
+        self.tree.setUniformRowHeights(True)
+
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        layout.addWidget(self.filter_input)
+        layout.addWidget(self.tree)
+        self.setWidget(widget)
+
+        self.update_language(current_language)
+
+    def update_language(self, new_language):
+        self.setWindowTitle(translations[new_language]["outline"])
+        self.filter_input.setPlaceholderText(translations[new_language]["filter_headings"])
+
+
+class Outline(QObject):
+    # Shows the headings of the current tab. Every tab keeps a HeadingIndex
+    # up to date as it is edited; the tree is only rebuilt when the list of
+    # headings it shows actually changed.
+    def __init__(self, main_window):
+        super().__init__(main_window)
+        self.main_window = main_window
+        self.panel = None
+        self.shown = None
+        # Tree item of each heading shown, by index into the heading list.
+        self.items = {}
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(REFRESH_DELAY_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def attach(self, container):
+        container.headings = HeadingIndex(container.editor.document())
+        container.editor.document().contentsChange.connect(
+            lambda position, removed, added, container=container: self.schedule(container))
+
+    def show_panel(self):
+        if not self.panel:
+            self.panel = OutlinePanel(self.main_window, self.main_window.current_language)
+            self.panel.filter_input.textChanged.connect(self.refresh)
+            self.panel.filter_input.returnPressed.connect(self.jump_to_first)
+            self.panel.tree.itemActivated.connect(self.jump_to_heading)
+            self.panel.visibilityChanged.connect(lambda visible: visible and self.refresh())
+            self.main_window.addDockWidget(Qt.LeftDockWidgetArea, self.panel)
+        self.panel.show()
+        self.panel.raise_()
+        self.panel.filter_input.setFocus()
+        self.panel.filter_input.selectAll()
+
+    def update_language(self, lang):
+        if self.panel:
+            self.panel.update_language(lang)
+
+    def is_visible(self):
+        return self.panel is not None and self.panel.isVisible()
+
+    def schedule(self, container):
+        if self.is_visible() and container is self.main_window.get_current_container_widget():
+            self.refresh_timer.start()
+
+    def refresh(self):
+        self.refresh_timer.stop()
+        if not self.is_visible():
+            return
+        container = self.main_window.get_current_container_widget()
+        headings = container.headings.headings() if container is not None and hasattr(container, 'headings') else []
+        filter_text = self.panel.filter_input.text().strip().lower()
+        # Line numbers shift with every new line typed above a heading; the
+        # tree keeps indices into the list and only changes with the titles.
+        shown = (container, filter_text, [(level, title) for _, level, title in headings])
+        if shown == self.shown:
+            return
+        previous, self.shown = self.shown, shown
+        if previous is not None and previous[:2] == shown[:2] and self.retitle(previous[2], shown[2]):
+            return
+        self.build_tree(headings, filter_text)
+
+    def retitle(self, old_titles, new_titles):
+        # Typing in a heading only renames items in place; anything that
+        # moves a heading in the tree rebuilds it.
+        if len(old_titles) != len(new_titles):
+            return False
+        changed = [index for index, (old, new) in enumerate(zip(old_titles, new_titles)) if old != new]
+        if any(old_titles[index][0] != new_titles[index][0] or index not in self.items for index in changed):
+            return False
+        if self.panel.filter_input.text().strip() and changed:
+            return False
+        for index in changed:
+            self.items[index].setText(0, new_titles[index][1])
+        return True
+
+    def build_tree(self, headings, filter_text):
+        tree = self.panel.tree
+        tree.setUpdatesEnabled(False)
+        tree.clear()
+        self.items = {}
+        items = []
+        if filter_text:
+            # Matches are listed flat, so none hides under a collapsed parent.
+            for index, (_, level, title) in enumerate(headings):
+                if filter_text in title.lower():
+                    item = QTreeWidgetItem([title])
+                    item.setData(0, Qt.UserRole, index)
+                    items.append(item)
+                    self.items[index] = item
+            tree.addTopLevelItems(items)
+        else:
+            parents = []
+            for index, (_, level, title) in enumerate(headings):
+                item = QTreeWidgetItem([title])
+                item.setData(0, Qt.UserRole, index)
+                self.items[index] = item
+                while parents and parents[-1][0] >= level:
+                    parents.pop()
+                if parents:
+                    parents[-1][1].addChild(item)
+                else:
+                    items.append(item)
+                parents.append((level, item))
+            tree.addTopLevelItems(items)
+            tree.expandAll()
+        tree.setUpdatesEnabled(True)
+
+    def jump_to_first(self):
+        item = self.panel.tree.topLevelItem(0)
+        if item is not None:
+            self.jump_to_heading(item)
+
+    def jump_to_heading(self, item):
+        container = self.main_window.get_current_container_widget()
+        if container is None or not hasattr(container, 'headings'):
+            return
+        headings = container.headings.headings()
+        index = item.data(0, Qt.UserRole)
+        if index is not None and index < len(headings):
+            self.main_window.file_manager.go_to_line(container, headings[index][0] + 1)
@@ -0,0 +1,116 @@
+import os
+import re
+
+from PyQt5.QtCore import QMimeData, Qt, QTimer, QUrl, pyqtSignal
+from PyQt5.QtGui import QTextDocument
+from PyQt5.QtWidgets import QTextBrowser
+
+from image_loader import image_key
+from preview_patcher import EMPTY_BLOCK_CHAR, SPACER_CHAR
+from preview_styles import IMAGE_MAX_WIDTH
+
+# Images finishing close together are laid out in one pass.
+RELAYOUT_DELAY_MS = 50
+# The spacer and empty-block paragraphs PreviewPatcher puts between blocks,
+# as lines of text and as paragraphs of copied HTML.
+SPACER_LINE_RE = re.compile(f'^[{SPACER_CHAR}{EMPTY_BLOCK_CHAR}]$\n?', re.MULTILINE)
+SPACER_PARAGRAPH_RE = re.compile(f'(<p\\b[^>]*>)?(<span\\b[^>]*>)?[{SPACER_CHAR}{EMPTY_BLOCK_CHAR}](?(2)</span>)(?(1)</p>\n?)')
+
+
+def strip_spacers(text):
+    return SPACER_LINE_RE.sub("", text)
+
+
+class PreviewBrowser(QTextBrowser):
+    # Local images come from the shared ImageLoader, decoded off the UI
+    # thread at the width the preview shows them; a placeholder stands in
+    # until they are ready. Other resources are left to QTextBrowser.
+    # A plain click (no selection, not on a link) reports the document
+    # position clicked, for jumping to its source.
+    source_clicked = pyqtSignal(int)
+
+    def __init__(self, container, image_loader):
+        super().__init__()
+        self.container = container
+        self.image_loader = image_loader
+        # Image key -> resource names showing its placeholder.
+        self.waiting = {}
+        self.loaded_names = set()
+        image_loader.loaded.connect(self.on_image_loaded)
+
+        self.relayout_timer = QTimer(self)
+        self.relayout_timer.setSingleShot(True)
+        self.relayout_timer.setInterval(RELAYOUT_DELAY_MS)
+        self.relayout_timer.timeout.connect(self.relayout_images)
+
+    def toPlainText(self):
+        return strip_spacers(super().toPlainText())
+
+    def createMimeDataFromSelection(self):
+        # Copied and dragged text leaves the spacers behind.
+        selection = super().createMimeDataFromSelection()
+        mime = QMimeData()
+        if selection.hasHtml():
+            mime.setHtml(SPACER_PARAGRAPH_RE.sub("", selection.html()))
+        if selection.hasText():
+            mime.setText(strip_spacers(selection.text()))
+        return mime
+
+    def mouseReleaseEvent(self, event):
+        super().mouseReleaseEvent(event)
+        if event.button() == Qt.LeftButton and not self.textCursor().hasSelection() and not self.anchorAt(event.pos()):
+            self.source_clicked.emit(self.cursorForPosition(event.pos()).position())
+
+    def image_path(self, url):
+        if url.scheme() == "file":
+            path = url.toLocalFile()
+        elif not url.scheme() and not url.host():
+            path = url.path()
+        else:
+            return None
+        if not path:
+            return None
+        if not os.path.isabs(path):
+            # Relative to the Markdown file, as in the HTML export.
+            current_file = self.container.current_file
+            path = os.path.join(os.path.dirname(current_file) if current_file else os.getcwd(), path)
+        return os.path.normpath(path)
+
+    def loadResource(self, resource_type, url):
+        if resource_type == QTextDocument.ImageResource:
+            path = self.image_path(url)
+            key = image_key(path, IMAGE_MAX_WIDTH) if path else None
+            image = self.image_loader.image(key) if key else None
+            if image is not None:
+                if image is self.image_loader.placeholder:
+                    self.waiting.setdefault(key, set()).add(url.toString())
+                return image
+        return super().loadResource(resource_type, url)
+
+    def on_image_loaded(self, key, image):
+        names = self.waiting.pop(key, None)
+        if not names or image is None:
+            return
+        # The document keeps the placeholder it was given, so the image is
+        # added under the same name; PreviewPatcher.rebuild drops these
+        # again, so edited or evicted files are looked up afresh.
+        document = self.document()
+        for name in names:
+            document.addResource(QTextDocument.ImageResource, QUrl(name), image)
+        self.loaded_names |= names
+        self.relayout_timer.start()
+
+    def relayout_images(self):
+        names = self.loaded_names
+        self.loaded_names = set()
+        document = self.document()
+        block = document.begin()
+        while block.isValid():
+            fragments = block.begin()
+            while not fragments.atEnd():
+                fragment = fragments.fragment()
+                text_format = fragment.charFormat()
+                if text_format.isImageFormat() and QUrl(text_format.toImageFormat().name()).toString() in names:
+                    document.markContentsDirty(fragment.position(), fragment.length())
+                fragments += 1
+            block = block.next()
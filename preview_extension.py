@@ -0,0 +1,44 @@
+import re
+
+from markdown.extensions import Extension
+from markdown.inlinepatterns import SimpleTagInlineProcessor
+from markdown.treeprocessors import Treeprocessor
+
+from preview_styles import IMAGE_MAX_WIDTH
+
+STRIKETHROUGH_RE = r'(~{2})(.+?)~{2}'
+TASK_RE = re.compile(r'\s*\[([ xX])\]\s*')
+RAW_IMAGE_RE = re.compile(r'<img\b', re.IGNORECASE)
+IMAGE_STYLE = f"max-width:{IMAGE_MAX_WIDTH}px; height:auto;"
+TASK_GLYPHS = {" ": "☐", "x": "✅", "X": "✅"}
+
+
+class PreviewTreeprocessor(Treeprocessor):
+    # Runs once over the finished tree, after inline patterns, so code spans
+    # and fenced code (kept as atomic text or stashed) are never touched.
+    def run(self, root):
+        for element in root.iter():
+            if element.tag == "img" and element.get("class") != "math":
+                style = element.get("style")
+                element.set("style", f"{style}; {IMAGE_STYLE}" if style else IMAGE_STYLE)
+            elif element.tag == "li":
+                self.mark_task(element)
+
+        raw_blocks = self.md.htmlStash.rawHtmlBlocks
+        for index, block in enumerate(raw_blocks):
+            if isinstance(block, str) and "<img" in block.lower():
+                raw_blocks[index] = RAW_IMAGE_RE.sub(f'<img style="{IMAGE_STYLE}"', block)
+
+    def mark_task(self, item):
+        target = item
+        if not (item.text or "").strip() and len(item) and item[0].tag == "p":
+            target = item[0]
+        match = TASK_RE.match(target.text or "")
+        if match:
+            target.text = TASK_GLYPHS[match.group(1)] + " " + target.text[match.end():]
+
+
+class PreviewExtension(Extension):
+    def extendMarkdown(self, md):
+        md.inlinePatterns.register(SimpleTagInlineProcessor(STRIKETHROUGH_RE, "del"), "strikethrough", 65)
+        md.treeprocessors.register(PreviewTreeprocessor(md), "preview", 15)
@@ -0,0 +1,134 @@
+from PyQt5.QtGui import QTextCursor
+
+# Every rendered block is preceded by a one-character spacer paragraph and
+# the document ends with one more, so a block can be replaced by editing
+# between two spacers without Qt merging its formats into a neighbour:
+#
+#   spacer, sep, block 0, sep, spacer, sep, block 1, ..., sep, spacer
+SPACER_CHAR = "\u200b"
+SPACER_HTML = '<p style="margin:0px; font-size:1px;">&#8203;</p>'
+# Blocks that render to nothing (e.g. only link definitions) still need a
+# slot of their own.
+EMPTY_BLOCK_CHAR = "\u2060"
+EMPTY_BLOCK_HTML = '<p style="margin:0px; font-size:1px;">&#8288;</p>'
+# Past this share of changed blocks a single setHtml is cheaper.
+REBUILD_RATIO = 0.5
+
+
+class PreviewPatcher:
+    def __init__(self, preview):
+        self.preview = preview
+        self.preview.document().setUndoRedoEnabled(False)
+        self.fragments = []
+        self.lengths = None
+        self.stylesheet = None
+
+    def update(self, fragments):
+        fragments = [html or EMPTY_BLOCK_HTML for html in fragments]
+        document = self.preview.document()
+        if self.lengths is None or self.stylesheet != document.defaultStyleSheet():
+            self.rebuild(fragments)
+            return
+
+        first, old_end, new_end = changed_range(self.fragments, fragments)
+        if first == old_end and first == new_end:
+            return
+        if new_end - first > REBUILD_RATIO * len(fragments) and len(fragments) > 1:
+            self.rebuild(fragments)
+            return
+        self.patch(fragments, first, old_end, new_end)
+
+    def rebuild(self, fragments):
+        view = self.save_view()
+        document = self.preview.document()
+        # clear() also drops images added with addResource, which setHtml
+        # keeps, so they are loaded again at their current size and date.
+        document.clear()
+        document.setHtml(SPACER_HTML + SPACER_HTML.join(fragments) + SPACER_HTML)
+        self.stylesheet = document.defaultStyleSheet()
+        self.fragments = fragments
+        self.lengths = measure_fragments(document, len(fragments))
+        self.restore_view(view)
+
+    def patch(self, fragments, first, old_end, new_end):
+        document = self.preview.document()
+        # End of the spacer text in front of the first changed block.
+        position = self.fragment_start(first) - 1
+
+        cursor = QTextCursor(document)
+        cursor.beginEditBlock()
+        if first < old_end:
+            cursor.setPosition(position)
+            cursor.setPosition(self.fragment_start(old_end) - 1, QTextCursor.KeepAnchor)
+            cursor.removeSelectedText()
+
+        lengths = []
+        for html in fragments[first:new_end]:
+            cursor.setPosition(position)
+            # The leading spacer merges into the existing one and is removed
+            # again, so the block's own first paragraph keeps its format.
+            cursor.insertHtml(SPACER_HTML + html + SPACER_HTML)
+            end = cursor.position()
+            cursor.setPosition(position)
+            cursor.deleteChar()
+            lengths.append(end - position - 4)
+            position = end - 1
+        cursor.endEditBlock()
+
+        self.fragments = fragments
+        self.lengths = self.lengths[:first] + lengths + self.lengths[old_end:]
+
+    def fragment_start(self, index):
+        return sum(self.lengths[:index]) + 3 * index + 2
+
+    def fragment_positions(self):
+        positions = []
+        position = 2
+        for length in self.lengths or ():
+            positions.append(position)
+            position += length + 3
+        return positions
+
+    def save_view(self):
+        cursor = self.preview.textCursor()
+        return (
+            self.preview.verticalScrollBar().value(),
+            self.preview.horizontalScrollBar().value(),
+            cursor.anchor(),
+            cursor.position(),
+        )
+
+    def restore_view(self, view):
+        vertical, horizontal, anchor, position = view
+        last = self.preview.document().characterCount() - 1
+        cursor = self.preview.textCursor()
+        cursor.setPosition(min(anchor, last))
+        cursor.setPosition(min(position, last), QTextCursor.KeepAnchor)
+        self.preview.setTextCursor(cursor)
+        self.preview.verticalScrollBar().setValue(vertical)
+        self.preview.horizontalScrollBar().setValue(horizontal)
+
+
+def changed_range(old, new):
+    limit = min(len(old), len(new))
+    first = 0
+    while first < limit and old[first] == new[first]:
+        first += 1
+    same_tail = 0
+    while same_tail < limit - first and old[-1 - same_tail] == new[-1 - same_tail]:
+        same_tail += 1
+    return first, len(old) - same_tail, len(new) - same_tail
+
+
+def measure_fragments(document, count):
+    spacers = []
+    block = document.begin()
+    while block.isValid():
+        if block.text() == SPACER_CHAR and block.charFormat().font().pixelSize() == 1 and not block.textList():
+            spacers.append(block.position())
+        block = block.next()
+    if len(spacers) != count + 1:
+        # Content that looks like a spacer; patching is not safe, so the next
+        # update rebuilds the whole document again.
+        return None
+    return [spacers[i + 1] - spacers[i] - 3 for i in range(count)]
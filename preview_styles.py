@@ -0,0 +1,106 @@
+from functools import lru_cache
+
+# Preview images are shown, and decoded, at most this wide.
+IMAGE_MAX_WIDTH = 200
+
+LIGHT_PREVIEW_COLORS = {
+    "text_color": "#000000",
+    "link_color": "#0000ee",
+    "border_color": "#ddd",
+    "header_bg": "#f2f2f2",
+    "code_bg": "#eaeaea",
+    "kbd_bg": "#f8f8f8",
+    "kbd_border": "#ccc",
+    "footnote_link_color": "#0000ee",
+    "footnote_border": "#ccc",
+    "footnote_hr": "#ccc",
+}
+
+DARK_PREVIEW_COLORS = {
+    "text_color": "#f0f0f0",
+    "link_color": "#99c1ff",
+    "border_color": "#555",
+    "header_bg": "#444",
+    "code_bg": "#3a3a3a",
+    "kbd_bg": "#2b2b2b",
+    "kbd_border": "#4b4b4b",
+    "footnote_link_color": "#99c1ff",
+    "footnote_border": "#444",
+    "footnote_hr": "#666",
+}
+
+PREVIEW_CSS_TEMPLATE = """
+body {{
+    font-family: Arial, sans-serif;
+    color: {text_color};
+}}
+a {{
+    color: {link_color};
+}}
+table {{
+    border-collapse: collapse;
+    width: 100%;
+    margin-top: 10px;
+    margin-bottom: 10px;
+}}
+th, td {{
+    border: 1px solid {border_color};
+    padding: 8px;
+    text-align: left;
+}}
+th {{
+    background-color: {header_bg};
+    font-weight: bold;
+}}
+pre {{
+    background-color: {code_bg};
+    padding: 10px;
+    border-radius: 5px;
+    overflow-x: auto;
+}}
+code {{
+    font-family: 'Courier New', Courier, monospace;
+}}
+kbd {{
+    font-family: monospace;
+    padding: 2px 4px;
+    border: 1px solid {kbd_border};
+    border-radius: 3px;
+    background-color: {kbd_bg};
+    font-size: 0.9em;
+    color: {text_color};
+    white-space: nowrap;
+    box-shadow: 0 1px 0 rgba(0, 0, 0, 0.2), 0 0 0 2px #fff inset;
+}}
+
+.footnote-ref a {{
+    color: {footnote_link_color};
+    font-size: 0.8em;
+    text-decoration: none;
+}}
+.footnote-backref {{
+    font-size: 0.8em;
+}}
+.footnote-backref a {{
+    color: {footnote_link_color};
+    text-decoration: none;
+}}
+hr.footnotes-sep {{
+    border: 0;
+    height: 1px;
+    background-color: {footnote_hr};
+    margin-top: 20px;
+    margin-bottom: 20px;
+}}
+
+del {{
+    text-decoration: line-through;
+    color: inherit;
+}}
+"""
+
+
+@lru_cache(maxsize=None)
+def preview_stylesheet(dark):
+    colors = DARK_PREVIEW_COLORS if dark else LIGHT_PREVIEW_COLORS
+    return PREVIEW_CSS_TEMPLATE.format(**colors)
@@ -0,0 +1,98 @@
+import os
+
+from utils import atomic_write
+
+# Kept free of Qt: these functions run in worker processes.
+MARKDOWN_SUFFIXES = (".md", ".markdown")
+MAX_HITS_PER_FILE = 1000
+MAX_LINE_PREVIEW = 200
+
+
+def iter_markdown_files(root, suffixes=MARKDOWN_SUFFIXES):
+    # Walks with scandir and skips hidden directories such as .git.
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        except OSError:
+            continue
+        subdirectories = []
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif entry.name.lower().endswith(suffixes) and entry.is_file():
+                    yield entry.path
+            except OSError:
+                continue
+        pending.extend(reversed(subdirectories))
+
+
+def read_text(path):
+    # newline="" keeps the file's own line endings for replace_in_files.
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def search_file(path, pattern):
+    return search_text(read_text(path), pattern)
+
+
+def search_text(text, pattern):
+    # (line number, line) for each match, one entry per match.
+    hits = []
+    line_number = 1
+    scanned = 0
+    for match in pattern.finditer(text):
+        if match.end() == match.start():
+            continue
+        line_number += text.count("\n", scanned, match.start())
+        scanned = match.start()
+        line_start = text.rfind("\n", 0, match.start()) + 1
+        line_end = text.find("\n", match.start())
+        if line_end == -1:
+            line_end = len(text)
+        hits.append((line_number, text[line_start:min(line_end, line_start + MAX_LINE_PREVIEW)].rstrip("\r")))
+        if len(hits) >= MAX_HITS_PER_FILE:
+            break
+    return hits
+
+
+def search_files(paths, pattern):
+    results = []
+    for path in paths:
+        try:
+            hits = search_file(path, pattern)
+        except (OSError, UnicodeDecodeError):
+            continue
+        if hits:
+            results.append((path, hits))
+    return results
+
+
+def replace_in_file(path, pattern, replacement, regex):
+    text = read_text(path)
+    if regex:
+        new_text, count = pattern.subn(replacement, text)
+    else:
+        new_text, count = pattern.subn(lambda match: replacement, text)
+    if count:
+        atomic_write(path, new_text, newline="")
+    return count
+
+
+def replace_files(paths, pattern, replacement, regex):
+    results = []
+    errors = []
+    for path in paths:
+        try:
+            count = replace_in_file(path, pattern, replacement, regex)
+        except (OSError, UnicodeDecodeError) as e:
+            errors.append((path, str(e)))
+            continue
+        if count:
+            results.append((path, count))
+    return results, errors
@@ -0,0 +1,311 @@
+import json
+import os
+import shutil
+import uuid
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtWidgets import QMessageBox
+
+from translations import translations
+from utils import atomic_write, data_home, utf16_len
+
+# Each modified tab gets a log in its session directory:
+#
+#   {"file": path, "mtime": ..., "size": ...}   or   {"file": path, "text": ...}
+#   [position, removed, "inserted text"]
+#   ...
+#
+# The first line is the base (the saved file on disk, or a checkpoint of the
+# whole text), the rest are edits in QTextDocument positions (UTF-16 units).
+JOURNAL_FLUSH_MS = 1000
+# Once the edits logged outgrow the text (and this floor), the log is
+# replaced by a fresh checkpoint. That keeps the file and the replay time on
+# startup bounded, and the cost of copying the text is spread over at least
+# as much typing as the text is long.
+COMPACT_MIN_BYTES = 64 * 1024
+NEWLINE_TABLE = str.maketrans({"\u2029": "\n", "\u2028": "\n", "\xa0": " "})
+
+
+def recovery_dir():
+    return os.path.join(data_home(), "recovery")
+
+
+def read_journal(path):
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line for line in f.read().split("\n") if line]
+    if not lines:
+        return None
+    base = json.loads(lines[0])
+    if "text" in base:
+        text = base["text"]
+    else:
+        try:
+            stat = os.stat(base["file"])
+        except OSError:
+            return None
+        # The edits only make sense against the file as it was.
+        if stat.st_mtime_ns != base["mtime"] or stat.st_size != base["size"]:
+            return None
+        with open(base["file"], "r", encoding="utf-8") as f:
+            text = f.read()
+
+    buffer = bytearray(text.encode("utf-16-le", "surrogatepass"))
+    for line in lines[1:]:
+        try:
+            position, removed, inserted = json.loads(line)
+        except ValueError:
+            # A write cut short by the crash; everything before it is intact.
+            break
+        buffer[2 * position:2 * (position + removed)] = inserted.encode("utf-16-le", "surrogatepass")
+    return base["file"], buffer.decode("utf-16-le", "surrogatepass")
+
+
+class JournalWrite(QRunnable):
+    def __init__(self, path, lines=None, checkpoint=None, delete=False):
+        super().__init__()
+        self.path = path
+        self.lines = lines
+        self.checkpoint = checkpoint
+        self.delete = delete
+
+    def run(self):
+        # The journal is best effort; a failed write must never get in the
+        # way of editing.
+        try:
+            if self.delete:
+                if os.path.exists(self.path):
+                    os.unlink(self.path)
+            elif self.checkpoint is not None:
+                atomic_write(self.path, json.dumps(self.checkpoint) + "\n")
+            elif self.lines:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(line + "\n" for line in self.lines))
+                    f.flush()
+                    os.fsync(f.fileno())
+        except (OSError, ValueError):
+            pass
+
+
+class RecoveryJournal(QObject):
+    def __init__(self, main_window):
+        super().__init__(main_window)
+        self.main_window = main_window
+        self.containers = []
+        self.session_dir = None
+        self.lock_file = None
+
+        # A single writer keeps each log's appends, checkpoints and deletes
+        # in the order they were queued.
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(JOURNAL_FLUSH_MS)
+        self.flush_timer.timeout.connect(self.flush)
+
+    def attach(self, container):
+        container.journal_path = None
+        container.journal_pending = []
+        container.journal_bytes = 0
+        container.journal_length = container.editor.document().characterCount() - 1
+        container.editor.document().contentsChange.connect(
+            lambda position, removed, added, container=container: self.record(container, position, removed, added))
+        self.containers.append(container)
+
+    def record(self, container, position, removed, added):
+        document = container.editor.document()
+        length = document.characterCount() - 1
+        before = container.journal_length
+        container.journal_length = length
+        if getattr(container, 'loading_job', None) is not None:
+            return
+
+        end = min(position + added, length)
+        cursor = QTextCursor(document)
+        cursor.setPosition(position)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        inserted = cursor.selectedText().translate(NEWLINE_TABLE)
+        # Changes touching the end of the document count its final paragraph
+        # separator, which is not part of the text.
+        removed = max(0, min(removed, before - position))
+        if before - removed + utf16_len(inserted) != length:
+            self.checkpoint(container)
+            return
+
+        if container.journal_path is None:
+            if container.is_modified:
+                self.checkpoint(container)
+                return
+            if not self.start(container, before):
+                return
+        line = json.dumps([position, removed, inserted])
+        container.journal_pending.append(line)
+        container.journal_bytes += len(line)
+        if container.journal_bytes >= max(COMPACT_MIN_BYTES, length):
+            self.checkpoint(container)
+        elif not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def start(self, container, length):
+        # Until now the tab matched its file (or was empty), so the log can
+        # refer to that instead of copying the text.
+        if container.current_file:
+            try:
+                stat = os.stat(container.current_file)
+            except OSError:
+                self.checkpoint(container)
+                return False
+            base = {"file": container.current_file, "mtime": stat.st_mtime_ns, "size": stat.st_size}
+        elif length == 0:
+            base = {"file": None, "text": ""}
+        else:
+            self.checkpoint(container)
+            return False
+        container.journal_path = self.new_path()
+        if container.journal_path is None:
+            return False
+        container.journal_pending = [json.dumps(base)]
+        container.journal_bytes = 0
+        return True
+
+    def checkpoint(self, container):
+        path = container.journal_path or self.new_path()
+        if path is None:
+            return
+        container.journal_path = path
+        container.journal_pending = []
+        container.journal_bytes = 0
+        # Encoding the text is left to the writer thread.
+        base = {"file": container.current_file, "text": container.editor.toPlainText()}
+        self.pool.start(JournalWrite(path, checkpoint=base))
+
+    def discard(self, container):
+        if getattr(container, 'journal_path', None) is None:
+            return
+        self.pool.start(JournalWrite(container.journal_path, delete=True))
+        container.journal_path = None
+        container.journal_pending = []
+        container.journal_bytes = 0
+
+    def detach(self, container):
+        self.discard(container)
+        if container in self.containers:
+            self.containers.remove(container)
+
+    def flush(self):
+        for container in self.containers:
+            if container.journal_path is not None and container.journal_pending:
+                self.pool.start(JournalWrite(container.journal_path, lines=container.journal_pending))
+                container.journal_pending = []
+
+    def new_path(self):
+        if self.session_dir is None and not self.open_session():
+            return None
+        return os.path.join(self.session_dir, uuid.uuid4().hex + ".log")
+
+    def open_session(self):
+        directory = os.path.join(recovery_dir(), uuid.uuid4().hex)
+        try:
+            os.makedirs(directory)
+            self.lock_file = open(os.path.join(directory, "lock"), "w")
+            if fcntl is not None:
+                fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        self.session_dir = directory
+        return True
+
+    def close_session(self):
+        # Clean exit: whatever was not saved was declined by the user.
+        self.flush_timer.stop()
+        self.pool.waitForDone()
+        if self.lock_file is not None:
+            self.lock_file.close()
+            self.lock_file = None
+        if self.session_dir is not None:
+            shutil.rmtree(self.session_dir, ignore_errors=True)
+            self.session_dir = None
+
+    def abandoned_sessions(self):
+        root = recovery_dir()
+        try:
+            names = sorted(os.listdir(root))
+        except OSError:
+            return []
+        sessions = []
+        for name in names:
+            directory = os.path.join(root, name)
+            if directory == self.session_dir or not os.path.isdir(directory):
+                continue
+            if fcntl is not None:
+                try:
+                    with open(os.path.join(directory, "lock"), "a") as lock:
+                        # Still held by another running window.
+                        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue
+            sessions.append(directory)
+        return sessions
+
+    def find_recoverable(self):
+        sessions = self.abandoned_sessions()
+        documents = []
+        for directory in sessions:
+            for name in sorted(os.listdir(directory)):
+                if not name.endswith(".log"):
+                    continue
+                try:
+                    document = read_journal(os.path.join(directory, name))
+                except (OSError, ValueError, KeyError, TypeError):
+                    continue
+                if document is not None:
+                    documents.append(document)
+        return sessions, documents
+
+    def offer_recovery(self):
+        sessions, documents = self.find_recoverable()
+        if not sessions:
+            return
+        if documents:
+            language = self.main_window.current_language
+            reply = QMessageBox.question(
+                self.main_window,
+                translations[language]["recover_title"],
+                translations[language]["recover_prompt"].format(len(documents)),
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if reply == QMessageBox.Yes:
+                self.restore(documents)
+                self.main_window.statusBar_message.showMessage(translations[language]["recovered_message"].format(len(documents)))
+        self.remove_sessions(sessions)
+
+    def restore(self, documents):
+        tab_widget = self.main_window.tab_widget
+        first = tab_widget.widget(0)
+        # Replace the empty tab opened at startup.
+        replace_first = tab_widget.count() == 1 and not first.is_modified and not first.current_file and not first.editor.toPlainText()
+
+        file_manager = self.main_window.file_manager
+        for file_path, text in documents:
+            self.main_window.add_new_tab(editor_text=text, file_path=file_path)
+            container = self.main_window.get_current_container_widget()
+            file_manager.set_tab_modified(container, True)
+            self.checkpoint(container)
+            # The recovered text takes the place of a tab the last session
+            # reopened on the saved file.
+            index = file_manager.tab_index(file_path, skip=container) if file_path else -1
+            if index != -1 and not tab_widget.widget(index).is_modified:
+                file_manager.remove_tab(index)
+        if replace_first:
+            file_manager.remove_tab(tab_widget.indexOf(first))
+
+    def remove_sessions(self, sessions):
+        for directory in sessions:
+            shutil.rmtree(directory, ignore_errors=True)
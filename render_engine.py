@@ -0,0 +1,73 @@
+import sys
+import threading
+import time
+
+MARKDOWN_EXTENSIONS = ['fenced_code', 'tables', 'codehilite', 'toc', 'footnotes', 'extra']
+# Converted once in the background at startup, so the imports and the
+# extension set-up are done before the first real render needs them.
+WARM_UP_SAMPLE = "# Title\n\nSome *text*.\n\n| a | b |\n|---|---|\n| 1 | 2 |\n\n```python\nx = 1\n```\n"
+
+# Building a Markdown instance loads every extension (and Pygments through
+# codehilite), so each thread builds one and resets it between documents.
+_local = threading.local()
+
+
+def get_markdown():
+    md = getattr(_local, 'md', None)
+    if md is None:
+        md = build_markdown()
+        _local.md = md
+    return md
+
+
+def build_markdown():
+    # Imported here rather than at module level: markdown, and Pygments
+    # behind codehilite, are the slowest imports in the app and are not
+    # needed to put the window on screen.
+    import markdown
+    import code_cache
+    from math_extension import MathExtension
+    from preview_extension import PreviewExtension
+    code_cache.install()
+    return markdown.Markdown(extensions=MARKDOWN_EXTENSIONS + [PreviewExtension(), MathExtension()])
+
+
+def render_markdown(raw_text):
+    return get_markdown().reset().convert(raw_text)
+
+
+def warm_up():
+    render_markdown(WARM_UP_SAMPLE)
+
+
+def benchmark(text, runs=200):
+    start = time.perf_counter()
+    for _ in range(runs):
+        build_markdown().convert(text)
+    per_call = (time.perf_counter() - start) / runs
+
+    get_markdown()
+    start = time.perf_counter()
+    for _ in range(runs):
+        get_markdown().reset().convert(text)
+    pooled = (time.perf_counter() - start) / runs
+    return per_call, pooled
+
+
+if __name__ == "__main__":
+    # python3 render_engine.py [file.md]
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "r", encoding="utf-8") as f:
+            sample = f.read()
+        runs = 20
+    else:
+        sample = "# Title\n\nSome *text* with `code` and a [link](http://example.com).\n\n- [ ] task\n"
+        runs = 200
+    per_call, pooled = benchmark(sample, runs)
+    print(f"new Markdown/call:   {per_call * 1000:.3f} ms/call")
+    print(f"pooled instance:     {pooled * 1000:.3f} ms/call")
+    print(f"speedup:             {per_call / pooled:.1f}x")
+
+    import code_cache
+    code_stats = code_cache.stats()
+    print(f"code block cache:    {code_stats['hits']} hits, {code_stats['misses']} misses, {code_stats['bytes']} bytes")
@@ -0,0 +1,183 @@
+import time
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal, pyqtSlot
+
+import startup_profile
+from block_renderer import IncrementalRenderer
+from render_engine import warm_up
+
+# Edits arriving closer together than DEBOUNCE_MS are merged into one render,
+# but a tab never waits longer than MAX_LATENCY_MS for a preview update.
+DEBOUNCE_MS = 150
+MAX_LATENCY_MS = 600
+MAX_RENDER_THREADS = 2
+# Pause between refreshing stale background tabs, so input is handled
+# in between.
+IDLE_REFRESH_MS = 50
+
+
+class RenderSignals(QObject):
+    finished = pyqtSignal(object, int, object)
+    failed = pyqtSignal(object, int, str)
+
+
+class RenderTask(QRunnable):
+    def __init__(self, container, generation, raw_text, signals):
+        super().__init__()
+        self.container = container
+        self.renderer = container.block_renderer
+        self.generation = generation
+        self.raw_text = raw_text
+        self.signals = signals
+
+    def run(self):
+        try:
+            blocks = self.renderer.render(self.raw_text)
+        except Exception as e:
+            self.signals.failed.emit(self.container, self.generation, str(e))
+            return
+        self.signals.finished.emit(self.container, self.generation, blocks)
+
+
+class WarmUpTask(QRunnable):
+    def run(self):
+        try:
+            warm_up()
+        except Exception:
+            # The first real render reports the problem.
+            return
+        startup_profile.mark("markdown and pygments ready")
+
+
+class RenderScheduler(QObject):
+    def __init__(self, main_window, debounce_ms=DEBOUNCE_MS, max_latency_ms=MAX_LATENCY_MS):
+        super().__init__(main_window)
+        self.main_window = main_window
+        self.debounce_ms = debounce_ms
+        self.max_latency_ms = max_latency_ms
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(MAX_RENDER_THREADS)
+        # Keep worker threads alive so their Markdown instances are reused.
+        self.pool.setExpiryTimeout(-1)
+
+        self.signals = RenderSignals()
+        self.signals.finished.connect(self.on_render_finished)
+        self.signals.failed.connect(self.on_render_failed)
+
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.setInterval(IDLE_REFRESH_MS)
+        self.idle_timer.timeout.connect(self.refresh_next_stale)
+
+    def warm_up(self):
+        # Started once the window is up; the worker thread keeps the
+        # instance it builds for the renders that follow.
+        self.pool.start(WarmUpTask())
+
+    def attach(self, container):
+        container.render_generation = 0
+        container.render_in_flight = False
+        container.render_first_request = None
+        container.preview_stale = False
+        container.block_renderer = IncrementalRenderer()
+
+        timer = QTimer(container)
+        timer.setSingleShot(True)
+        timer.timeout.connect(lambda container=container: self.dispatch(container))
+        container.render_timer = timer
+
+    def schedule(self, container):
+        container.render_generation += 1
+
+        now = time.monotonic()
+        if container.render_first_request is None:
+            container.render_first_request = now
+        waited_ms = (now - container.render_first_request) * 1000
+        remaining_ms = max(0, self.max_latency_ms - waited_ms)
+        container.render_timer.start(int(min(self.debounce_ms, remaining_ms)))
+
+    def render_now(self, container):
+        container.render_generation += 1
+        container.render_timer.stop()
+        self.dispatch(container)
+
+    def cancel(self, container):
+        if not hasattr(container, 'render_timer'):
+            return
+        container.render_generation += 1
+        container.render_timer.stop()
+        container.render_first_request = None
+
+    def invalidate_all(self, rerender=False):
+        # Only the visible tab is refreshed right away; the others are
+        # marked stale and refreshed on activation or when the app is idle.
+        # rerender runs the blocks through the renderer again, which only
+        # converts those whose cache key changed.
+        tab_widget = self.main_window.tab_widget
+        for i in range(tab_widget.count()):
+            container = tab_widget.widget(i)
+            if hasattr(container, 'render_timer'):
+                container.preview_stale = True
+                if rerender:
+                    container.preview_blocks = []
+        current = tab_widget.currentWidget()
+        if current is not None and getattr(current, 'preview_stale', False):
+            self.refresh(current)
+        self.idle_timer.start()
+
+    def refresh(self, container):
+        container.preview_stale = False
+        if container.preview_blocks:
+            self.main_window.apply_preview(container, container.preview_blocks)
+        else:
+            self.render_now(container)
+
+    def refresh_if_stale(self, container):
+        if getattr(container, 'preview_stale', False):
+            self.refresh(container)
+
+    def refresh_next_stale(self):
+        tab_widget = self.main_window.tab_widget
+        current = tab_widget.currentIndex()
+        stale = [i for i in range(tab_widget.count()) if getattr(tab_widget.widget(i), 'preview_stale', False)]
+        if not stale:
+            return
+        # Tabs next to the current one are the likeliest to be opened next.
+        index = min(stale, key=lambda i: abs(i - current))
+        self.refresh(tab_widget.widget(index))
+        if len(stale) > 1:
+            self.idle_timer.start()
+
+    def dispatch(self, container):
+        container.render_first_request = None
+        # Only one conversion per tab runs at a time; the finished handler
+        # picks up whatever arrived while it was busy.
+        if container.render_in_flight:
+            return
+        container.render_in_flight = True
+        task = RenderTask(container, container.render_generation, container.editor.toPlainText(), self.signals)
+        self.pool.start(task)
+
+    def is_open(self, container):
+        return self.main_window.tab_widget.indexOf(container) != -1
+
+    def finish(self, container, generation):
+        container.render_in_flight = False
+        if generation == container.render_generation:
+            return True
+        if self.is_open(container) and not container.render_timer.isActive():
+            self.dispatch(container)
+        return False
+
+    @pyqtSlot(object, int, object)
+    def on_render_finished(self, container, generation, blocks):
+        if not self.finish(container, generation) or not self.is_open(container):
+            return
+        self.main_window.apply_preview(container, blocks)
+
+    @pyqtSlot(object, int, str)
+    def on_render_failed(self, container, generation, error):
+        if not self.finish(container, generation) or not self.is_open(container):
+            return
+        self.main_window.show_render_error(error)
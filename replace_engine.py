@@ -0,0 +1,51 @@
+import re
+
+from utils import utf16_offsets
+
+# Words in the sense of Qt's FindWholeWords: the match may not touch a word
+# character on either side, which also works for queries like "a+" or "#".
+WHOLE_WORD_TEMPLATE = r"(?<!\w)(?:{})(?!\w)"
+
+
+def compile_pattern(query, case_sensitive=False, whole_word=False, regex=False):
+    # Raises re.error for an invalid regular expression.
+    source = query if regex else re.escape(query)
+    if whole_word:
+        source = WHOLE_WORD_TEMPLATE.format(source)
+    flags = re.MULTILINE
+    if not case_sensitive:
+        flags |= re.IGNORECASE
+    return re.compile(source, flags)
+
+
+def expand_function(replacement, regex):
+    # Backreferences (\1, \g<name>) only mean something in regex mode; a
+    # literal replacement is inserted as typed.
+    if regex:
+        return lambda match: match.expand(replacement)
+    return lambda match: replacement
+
+
+def find_matches(pattern, text):
+    # Non-empty matches as (start, end) UTF-16 positions.
+    offsets = []
+    for match in pattern.finditer(text):
+        if match.end() > match.start():
+            offsets.append(match.start())
+            offsets.append(match.end())
+    positions = utf16_offsets(text, offsets)
+    return list(zip(positions[0::2], positions[1::2]))
+
+
+def plan_replacements(pattern, text, replacement, regex=False):
+    # One pass over the snapshot; each entry is (start, end, new_text) in
+    # UTF-16 positions, ready to be applied to a QTextDocument.
+    expand = expand_function(replacement, regex)
+    starts_ends = []
+    new_texts = []
+    for match in pattern.finditer(text):
+        starts_ends.append(match.start())
+        starts_ends.append(match.end())
+        new_texts.append(expand(match))
+    positions = utf16_offsets(text, starts_ends)
+    return list(zip(positions[0::2], positions[1::2], new_texts))
@@ -0,0 +1,153 @@
+from bisect import bisect_right
+
+from PyQt5.QtCore import QObject
+
+
+class BlockTops:
+    # The preview's y coordinate of each rendered block, looked up only
+    # for the indices a binary search visits and kept until the preview
+    # is laid out again.
+    def __init__(self, document, positions):
+        self.document = document
+        self.positions = positions
+        self.tops = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, index):
+        top = self.tops.get(index)
+        if top is None:
+            block = self.document.findBlock(self.positions[index])
+            top = self.tops[index] = self.document.documentLayout().blockBoundingRect(block).top()
+        return top
+
+
+class ScrollMap:
+    # First source line and preview position of every rendered block, as
+    # produced by IncrementalRenderer and PreviewPatcher. Both lists are
+    # ascending, so either side is found with a binary search.
+    def __init__(self, document, lines, positions):
+        self.document = document
+        self.lines = lines
+        self.positions = positions
+        self.tops = BlockTops(document, positions)
+
+    def relayout(self):
+        self.tops = BlockTops(self.document, self.positions)
+
+    def block_span(self, index, line_count):
+        # Source lines and preview height covered by block index.
+        start_line, start_top = self.lines[index], self.tops[index]
+        if index + 1 < len(self.lines):
+            return start_line, self.lines[index + 1], start_top, self.tops[index + 1]
+        return start_line, max(line_count, start_line + 1), start_top, self.document.size().height()
+
+    def preview_y(self, line, line_count):
+        index = max(0, bisect_right(self.lines, int(line)) - 1)
+        start_line, end_line, start_top, end_top = self.block_span(index, line_count)
+        fraction = min(1.0, max(0.0, (line - start_line) / (end_line - start_line)))
+        return start_top + fraction * (end_top - start_top)
+
+    def source_line(self, y, line_count):
+        index = max(0, bisect_right(self.tops, y) - 1)
+        start_line, end_line, start_top, end_top = self.block_span(index, line_count)
+        if end_top <= start_top:
+            return float(start_line)
+        fraction = min(1.0, max(0.0, (y - start_top) / (end_top - start_top)))
+        return start_line + fraction * (end_line - start_line)
+
+    def line_at_position(self, position):
+        index = max(0, bisect_right(self.positions, position) - 1)
+        return self.lines[index]
+
+
+class ScrollSync(QObject):
+    # Keeps the top of the editor and of the preview showing the same part
+    # of the document, in both directions, and jumps to the source of a
+    # block clicked in the preview.
+    def __init__(self, main_window):
+        super().__init__(main_window)
+        self.main_window = main_window
+        self.syncing = False
+
+    def attach(self, container):
+        container.scroll_map = None
+        editor, preview = container.editor, container.preview
+        editor.verticalScrollBar().valueChanged.connect(lambda value, container=container: self.sync_preview(container))
+        preview.verticalScrollBar().valueChanged.connect(lambda value, container=container: self.sync_editor(container))
+        preview.document().documentLayout().documentSizeChanged.connect(lambda size, container=container: self.relayout(container))
+        # The preview is laid out a piece at a time after an update, so the
+        # position asked for may only become reachable later.
+        preview.verticalScrollBar().rangeChanged.connect(lambda minimum, maximum, container=container: self.sync_preview(container))
+        preview.source_clicked.connect(lambda position, container=container: self.jump_to_source(container, position))
+
+    def update_preview(self, container, blocks):
+        # Replacing the preview's contents moves its scroll bar, which must
+        # not scroll the editor.
+        self.syncing = True
+        try:
+            container.preview_patcher.update([html for _, html in blocks])
+        finally:
+            self.syncing = False
+        self.update_map(container, blocks)
+        self.sync_preview(container)
+
+    def update_map(self, container, blocks):
+        positions = container.preview_patcher.fragment_positions()
+        if len(positions) != len(blocks):
+            # The patcher could not measure the blocks; scrolling falls
+            # back to keeping both sides at the same proportion.
+            container.scroll_map = None
+            return
+        container.scroll_map = ScrollMap(container.preview.document(), [start for start, _ in blocks], positions)
+
+    def relayout(self, container):
+        if container.scroll_map is not None:
+            container.scroll_map.relayout()
+
+    def editor_top_line(self, editor):
+        block = editor.firstVisibleBlock()
+        rect = editor.blockBoundingGeometry(block).translated(editor.contentOffset())
+        return block.blockNumber() + max(0.0, -rect.top()) / max(1.0, rect.height())
+
+    def scroll_editor_to_line(self, editor, line):
+        block = editor.document().findBlockByNumber(int(line))
+        if not block.isValid():
+            return
+        # The editor scrolls by layout lines, which differ from blocks once
+        # long lines wrap.
+        editor.verticalScrollBar().setValue(block.firstLineNumber() + int((line - int(line)) * block.lineCount()))
+
+    def sync_preview(self, container):
+        if self.syncing:
+            return
+        editor_bar, preview_bar = container.editor.verticalScrollBar(), container.preview.verticalScrollBar()
+        self.syncing = True
+        try:
+            if container.scroll_map is None:
+                preview_bar.setValue(round(preview_bar.maximum() * editor_bar.value() / max(1, editor_bar.maximum())))
+            else:
+                line_count = container.editor.document().blockCount()
+                preview_bar.setValue(round(container.scroll_map.preview_y(self.editor_top_line(container.editor), line_count)))
+        finally:
+            self.syncing = False
+
+    def sync_editor(self, container):
+        if self.syncing:
+            return
+        editor_bar, preview_bar = container.editor.verticalScrollBar(), container.preview.verticalScrollBar()
+        self.syncing = True
+        try:
+            if container.scroll_map is None:
+                editor_bar.setValue(round(editor_bar.maximum() * preview_bar.value() / max(1, preview_bar.maximum())))
+            else:
+                line_count = container.editor.document().blockCount()
+                self.scroll_editor_to_line(container.editor, container.scroll_map.source_line(preview_bar.value(), line_count))
+        finally:
+            self.syncing = False
+
+    def jump_to_source(self, container, position):
+        if container.scroll_map is None:
+            return
+        self.main_window.file_manager.go_to_line(container, container.scroll_map.line_at_position(position) + 1)
@@ -1,12 +1,33 @@
-from PyQt5.QtWidgets import QMessageBox
-from PyQt5.QtGui import QTextDocument, QTextCursor
+import re
+
+from PyQt5.QtCore import QPoint, QThreadPool, QTimer
+from PyQt5.QtWidgets import QMessageBox, QTextEdit
+from PyQt5.QtGui import QColor, QTextCharFormat, QTextCursor
 from dialogs import FindReplaceDialog
 from translations import translations
+from replace_engine import compile_pattern, find_matches, plan_replacements, expand_function
+from match_index import MatchIndex
+
+# Delay between the last keystroke in the find box and a new scan.
+SEARCH_DEBOUNCE_MS = 150
+HIGHLIGHT_COLOR = QColor(255, 200, 0, 110)
 
 class SearchReplace:
     def __init__(self, parent):
         self.parent = parent
         self.find_replace_dialog = None
+        self.indexes = []
+        # A single scan thread; a new query makes the running scan give up.
+        self.pool = QThreadPool(parent)
+        self.pool.setMaxThreadCount(1)
+        self.search_timer = QTimer(parent)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.search_as_you_type)
+        self.incremental = False
+        self.pattern_error = None
+        self.highlight_format = QTextCharFormat()
+        self.highlight_format.setBackground(HIGHLIGHT_COLOR)
 
     def show_find_replace_dialog(self):
         if not self.parent.get_current_editor():
@@ -19,6 +40,11 @@ class SearchReplace:
             self.find_replace_dialog.find_prev_button.clicked.connect(self.find_previous)
             self.find_replace_dialog.replace_button.clicked.connect(self.replace_text)
             self.find_replace_dialog.replace_all_button.clicked.connect(self.replace_all)
+            self.find_replace_dialog.find_input.textChanged.connect(self.query_changed)
+            self.find_replace_dialog.case_checkbox.toggled.connect(self.query_changed)
+            self.find_replace_dialog.whole_word_checkbox.toggled.connect(self.query_changed)
+            self.find_replace_dialog.regex_checkbox.toggled.connect(self.query_changed)
+            self.find_replace_dialog.finished.connect(self.clear_indexes)
             self.find_replace_dialog.setModal(False)
             self.find_replace_dialog.show()
         else:
@@ -26,40 +52,161 @@ class SearchReplace:
             self.find_replace_dialog.show()
             self.find_replace_dialog.activateWindow()
         self.find_replace_dialog.find_input.setFocus()
+        self.find_replace_dialog.find_input.selectAll()
+        self.refresh_index()
+
+    def current_index(self):
+        container = self.parent.get_current_container_widget()
+        if not container or not hasattr(container, 'editor'):
+            return None
+        if getattr(container, 'match_index', None) is None:
+            container.match_index = MatchIndex(container.editor.document(), self.pool)
+            container.match_index.changed.connect(lambda container=container: self.index_changed(container))
+            container.editor.verticalScrollBar().valueChanged.connect(lambda _, container=container: self.update_highlights(container))
+            self.indexes.append(container)
+        return container.match_index
+
+    def is_active(self):
+        return self.find_replace_dialog is not None and self.find_replace_dialog.isVisible()
+
+    def query_changed(self):
+        self.incremental = True
+        self.search_timer.start()
+
+    def search_as_you_type(self):
+        self.refresh_index(quiet=True)
+
+    def refresh_index(self, quiet=False):
+        # Called for new queries and tab switches while the dialog is open.
+        if not self.is_active():
+            return
+        index = self.current_index()
+        if index is None:
+            return
+        pattern = self.current_pattern(quiet)
+        if pattern is None or index.pattern != pattern:
+            index.set_pattern(pattern)
+        else:
+            self.index_changed(self.parent.get_current_container_widget())
+
+    def clear_indexes(self):
+        self.search_timer.stop()
+        for container in self.indexes:
+            container.match_index.set_pattern(None)
+            container.editor.setExtraSelections([])
+
+    def forget_tab(self, container):
+        if container in self.indexes:
+            self.indexes.remove(container)
+            container.match_index.detach()
+            container.match_index = None
+
+    def index_changed(self, container):
+        self.update_highlights(container)
+        if container is not self.parent.get_current_container_widget():
+            return
+        index = container.match_index
+        if self.incremental and index.ready:
+            # Search as you type: jump to the first hit from where the
+            # current selection starts.
+            self.incremental = False
+            if index.matches:
+                self.select_match(container.editor, index, index.next_match(container.editor.textCursor().selectionStart()))
+        self.update_match_label()
+
+    def update_highlights(self, container):
+        index = getattr(container, 'match_index', None)
+        editor = container.editor
+        if index is None or index.pattern is None:
+            editor.setExtraSelections([])
+            return
+        # Only the matches on screen get a selection; the rest are picked up
+        # when scrolled to.
+        viewport = editor.viewport()
+        top = editor.cursorForPosition(QPoint(0, 0)).block().position()
+        bottom_block = editor.cursorForPosition(QPoint(viewport.width(), viewport.height())).block()
+        bottom = bottom_block.position() + bottom_block.length()
+        selections = []
+        for start, end in index.visible(top, bottom):
+            selection = QTextEdit.ExtraSelection()
+            selection.cursor = QTextCursor(editor.document())
+            selection.cursor.setPosition(start)
+            selection.cursor.setPosition(end, QTextCursor.KeepAnchor)
+            selection.format = self.highlight_format
+            selections.append(selection)
+        editor.setExtraSelections(selections)
+
+    def update_match_label(self):
+        if not self.find_replace_dialog:
+            return
+        language = self.parent.current_language
+        container = self.parent.get_current_container_widget()
+        index = getattr(container, 'match_index', None) if container else None
+        if self.pattern_error is not None:
+            text = translations[language]["invalid_regex"].format(self.pattern_error)
+        elif index is None or index.pattern is None or not index.ready:
+            text = ""
+        elif not index.matches:
+            text = translations[language]["no_match_found"].format(self.find_replace_dialog.find_input.text())
+        else:
+            cursor = container.editor.textCursor()
+            position = index.match_at(cursor.selectionStart(), cursor.selectionEnd())
+            if position >= 0:
+                text = translations[language]["match_position"].format(position + 1, len(index.matches))
+            else:
+                text = translations[language]["match_total"].format(len(index.matches))
+        self.find_replace_dialog.match_count_label.setText(text)
+
+    def select_match(self, editor, index, position):
+        start, end = index.matches[position]
+        cursor = editor.textCursor()
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        editor.setTextCursor(cursor)
+        self.update_match_label()
+
+    def current_pattern(self, quiet=False):
+        dialog = self.find_replace_dialog
+        find_text = dialog.find_input.text()
+        self.pattern_error = None
+        if not find_text: return None
+        try:
+            return compile_pattern(find_text, dialog.case_checkbox.isChecked(), dialog.whole_word_checkbox.isChecked(), dialog.regex_checkbox.isChecked())
+        except re.error as e:
+            self.pattern_error = e
+            # While typing, a half-written regex is expected; the dialog
+            # shows the error instead of a message box.
+            if not quiet:
+                self.show_invalid_regex(e)
+            return None
+
+    def show_invalid_regex(self, error):
+        QMessageBox.warning(self.parent, translations[self.parent.current_language]["find_replace_title"],
+                            translations[self.parent.current_language]["invalid_regex"].format(error))
 
     def find_text(self, forward=True):
         editor = self.parent.get_current_editor()
         if not editor: return False
 
-        find_text = self.find_replace_dialog.find_input.text()
-        if not find_text: return False
+        pattern = self.current_pattern()
+        if not pattern: return False
 
-        flags = QTextDocument.FindFlags()
-        if not forward:
-            flags |= QTextDocument.FindBackward
+        index = self.current_index()
+        if index.pattern != pattern or not index.ready:
+            # No finished index for this query yet; answer from a direct scan.
+            index.load(pattern, find_matches(pattern, editor.toPlainText()))
+        self.incremental = False
+        if not index.matches:
+            self.update_match_label()
+            return False
 
         cursor = editor.textCursor()
-        if not cursor.hasSelection():
-            if forward:
-                cursor.movePosition(QTextCursor.Start)
-            else:
-                cursor.movePosition(QTextCursor.End)
-            editor.setTextCursor(cursor)
-
-        found = editor.find(find_text, flags)
-        
-        if not found:
-            if forward:
-                cursor.movePosition(QTextCursor.Start)
-            else:
-                cursor.movePosition(QTextCursor.End)
-            editor.setTextCursor(cursor)
-            found = editor.find(find_text, flags)
-            
-            if not found:
-                QMessageBox.information(self.parent, translations[self.parent.current_language]["find_replace_title"],
-                                        translations[self.parent.current_language]["no_match_found"].format(find_text))
-        return found
+        if forward:
+            position = index.next_match(cursor.selectionEnd() if cursor.hasSelection() else 0)
+        else:
+            position = index.previous_match(cursor.selectionStart() if cursor.hasSelection() else editor.document().characterCount())
+        self.select_match(editor, index, position)
+        return True
 
     def find_next(self):
         self.find_text(forward=True)
@@ -71,42 +218,44 @@ class SearchReplace:
         editor = self.parent.get_current_editor()
         if not editor: return
 
-        find_text = self.find_replace_dialog.find_input.text()
-        replace_text = self.find_replace_dialog.replace_input.text()
-
-        if not find_text: return
+        pattern = self.current_pattern()
+        if not pattern: return
 
+        dialog = self.find_replace_dialog
         cursor = editor.textCursor()
-        if cursor.hasSelection() and cursor.selectedText() == find_text:
-            cursor.insertText(replace_text)
-            editor.setTextCursor(cursor)
+        if cursor.hasSelection():
+            match = pattern.fullmatch(cursor.selectedText().replace("\u2029", "\n"))
+            if match:
+                try:
+                    cursor.insertText(expand_function(dialog.replace_input.text(), dialog.regex_checkbox.isChecked())(match))
+                except (re.error, IndexError) as e:
+                    self.show_invalid_regex(e)
+                    return
+                editor.setTextCursor(cursor)
         self.find_next()
 
     def replace_all(self):
         editor = self.parent.get_current_editor()
         if not editor: return
 
-        find_text = self.find_replace_dialog.find_input.text()
-        replace_text = self.find_replace_dialog.replace_input.text()
+        pattern = self.current_pattern()
+        if not pattern: return
 
-        if not find_text: return
+        dialog = self.find_replace_dialog
+        try:
+            replacements = plan_replacements(pattern, editor.toPlainText(), dialog.replace_input.text(), dialog.regex_checkbox.isChecked())
+        except (re.error, IndexError) as e:
+            self.show_invalid_regex(e)
+            return
 
-        editor.blockSignals(True)
-        doc = editor.document()
-        cursor = QTextCursor(doc)
-        
-        cursor.movePosition(QTextCursor.Start)
-        editor.setTextCursor(cursor)
+        # Applied back to front so earlier positions stay valid, as one undo
+        # step and one textChanged for the preview and counters.
+        cursor = QTextCursor(editor.document())
+        cursor.beginEditBlock()
+        for start, end, new_text in reversed(replacements):
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.KeepAnchor)
+            cursor.insertText(new_text)
+        cursor.endEditBlock()
 
-        count = 0
-        while editor.find(find_text):
-            current_cursor = editor.textCursor()
-            if current_cursor.hasSelection():
-                current_cursor.insertText(replace_text)
-                count += 1
-            else:
-                break
-        
-        editor.blockSignals(False)
-        self.parent.update_preview_and_counts()
-        self.parent.statusBar_message.showMessage(translations[self.parent.current_language]["replace_all_message"].format(count))
+        self.parent.statusBar_message.showMessage(translations[self.parent.current_language]["replace_all_message"].format(len(replacements)))
@@ -0,0 +1,106 @@
+import json
+import os
+
+from PyQt5.QtWidgets import QWidget
+
+from utils import atomic_write, data_home
+
+# {"active": index, "tabs": [{"file": path, "cursor": position, "scroll": value}, ...]}
+# Untitled tabs are not part of the session; the recovery journal keeps
+# unsaved text.
+
+
+def session_path():
+    return os.path.join(data_home(), "session.json")
+
+
+def read_session(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            session = json.load(f)
+        tabs = [tab for tab in session.get("tabs", []) if isinstance(tab.get("file"), str)]
+        return tabs, int(session.get("active", 0))
+    except (OSError, ValueError, TypeError, AttributeError):
+        return [], 0
+
+
+class SessionManager:
+    def __init__(self, parent):
+        self.parent = parent
+
+    def restore(self):
+        # Opens the tabs of the last session as placeholders that hold only
+        # the file name and view; only the active one is built and loaded.
+        tabs, active = read_session(session_path())
+        tabs = [tab for tab in tabs if os.path.isfile(tab["file"])]
+        if not tabs:
+            return False
+        tab_widget = self.parent.tab_widget
+        # Adding the first tab would make it current, and so load it.
+        tab_widget.blockSignals(True)
+        try:
+            for tab in tabs:
+                self.add_placeholder(tab)
+            tab_widget.setCurrentIndex(min(max(active, 0), len(tabs) - 1))
+        finally:
+            tab_widget.blockSignals(False)
+        self.materialize(tab_widget.currentWidget())
+        self.parent.update_window_title()
+        return True
+
+    def add_placeholder(self, tab):
+        container = QWidget()
+        container.current_file = tab["file"]
+        container.is_modified = False
+        container.pending_view = (tab.get("cursor", 0), tab.get("scroll", 0))
+        self.parent.tab_widget.addTab(container, os.path.basename(tab["file"]))
+
+    def is_placeholder(self, container):
+        return container is not None and not hasattr(container, 'editor')
+
+    def materialize_current(self):
+        self.materialize(self.parent.get_current_container_widget())
+
+    def materialize(self, container):
+        if not self.is_placeholder(container):
+            return
+        self.parent.build_tab(container)
+        self.parent.file_manager.load_file(container.current_file, container)
+
+    def restore_view(self, container):
+        # Called once the file is in; the saved cursor and scroll position
+        # are only meaningful against the full text.
+        view = getattr(container, 'pending_view', None)
+        if view is None:
+            return
+        container.pending_view = None
+        cursor_position, scroll = view
+        editor = container.editor
+        cursor = editor.textCursor()
+        cursor.setPosition(min(max(cursor_position, 0), editor.document().characterCount() - 1))
+        editor.setTextCursor(cursor)
+        editor.verticalScrollBar().setValue(scroll)
+
+    def tab_state(self, container):
+        view = getattr(container, 'pending_view', None)
+        if view is None:
+            view = (container.editor.textCursor().position(), container.editor.verticalScrollBar().value())
+        return {"file": os.path.abspath(container.current_file), "cursor": view[0], "scroll": view[1]}
+
+    def save(self):
+        tab_widget = self.parent.tab_widget
+        tabs = []
+        active = 0
+        for i in range(tab_widget.count()):
+            container = tab_widget.widget(i)
+            if not container.current_file:
+                continue
+            if i == tab_widget.currentIndex():
+                active = len(tabs)
+            tabs.append(self.tab_state(container))
+        path = session_path()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write(path, json.dumps({"active": active, "tabs": tabs}))
+        except OSError:
+            pass
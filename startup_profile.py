@@ -0,0 +1,23 @@
+import sys
+import time
+
+# Enabled by main.py for --startup-profile. Marks are printed as they happen,
+# since some arrive from worker threads after the window is up.
+enabled = False
+start = time.perf_counter()
+last = start
+
+
+def enable(started_at):
+    global enabled, start, last
+    enabled = True
+    start = last = started_at
+
+
+def mark(label):
+    global last
+    if not enabled:
+        return
+    now = time.perf_counter()
+    print(f"startup: {(now - start) * 1000:8.1f} ms  (+{(now - last) * 1000:7.1f} ms)  {label}", file=sys.stderr, flush=True)
+    last = now
@@ -1,11 +1,13 @@
 from PyQt5.QtWidgets import QMessageBox
 from translations import translations
-import markdown
+from preview_styles import preview_stylesheet
+import math_renderer
 
 class ThemeManager:
     def __init__(self, parent):
         self.parent = parent
         self.is_dark_theme = False
+        self.preview_stylesheet = preview_stylesheet(False)
 
     def toggle_theme(self):
         if self.is_dark_theme:
@@ -13,19 +15,19 @@ class ThemeManager:
         else:
             self.dark_theme()
         
-        for i in range(self.parent.tab_widget.count()):
-            container_widget = self.parent.tab_widget.widget(i)
-            if hasattr(container_widget, 'editor') and hasattr(container_widget, 'preview'):
-                self.update_single_tab_preview(container_widget.editor, container_widget.preview)
+        # Formula images are drawn in the theme's text colour.
+        math_renderer.set_dark(self.is_dark_theme)
+        self.parent.render_scheduler.invalidate_all(rerender=True)
 
     def light_theme(self):
         self.parent.setStyleSheet("")
         self.is_dark_theme = False
+        self.update_preview_stylesheets()
         self.parent.statusBar_message.showMessage(translations[self.parent.current_language]["light_theme"])
 
     def dark_theme(self):
         dark_stylesheet = """
-            QTextEdit {
+            QTextEdit, QPlainTextEdit {
                 background-color: #2e2e2e;
                 color: #f0f0f0;
                 border: 1px solid #555;
@@ -106,31 +108,28 @@ class ThemeManager:
         """
         self.parent.setStyleSheet(dark_stylesheet)
         self.is_dark_theme = True
+        self.update_preview_stylesheets()
         self.parent.statusBar_message.showMessage(translations[self.parent.current_language]["dark_theme"])
     
-    def update_single_tab_preview(self, editor, preview):
-        raw_text = editor.toPlainText()
-        html = markdown.markdown(raw_text, extensions=['fenced_code', 'tables', 'codehilite', 'toc'])
-        
-        if self.is_dark_theme:
-            text_color = "#f0f0f0"
-            border_color = "#555"
-            header_bg = "#444"
-            code_bg = "#3a3a3a"
-        else:
-            text_color = "#000000"
-            border_color = "#ddd"
-            header_bg = "#f2f2f2"
-            code_bg = "#eaeaea"
+    def update_preview_stylesheets(self):
+        # Compiled once per theme; installed as the document default so that
+        # rendering only has to hand the body HTML to Qt.
+        self.preview_stylesheet = preview_stylesheet(self.is_dark_theme)
+        current = self.parent.tab_widget.currentWidget()
+        for i in range(self.parent.tab_widget.count()):
+            container_widget = self.parent.tab_widget.widget(i)
+            if hasattr(container_widget, 'preview'):
+                self.apply_preview_stylesheet(container_widget.preview)
+            if hasattr(container_widget, 'highlighter'):
+                # Restyling walks every line of the document, so background
+                # tabs wait until they are shown again.
+                container_widget.highlighter_stale = True
+        self.restyle_if_stale(current)
 
-        css_style = f"""
-        <style>
-            body {{ color: {text_color}; }}
-            table {{ border-collapse: collapse; width: 100%; margin-top: 10px; margin-bottom: 10px; }}
-            th, td {{ border: 1px solid {border_color}; padding: 8px; text-align: left; }}
-            th {{ background-color: {header_bg}; font-weight: bold; }}
-            pre {{ background-color: {code_bg}; padding: 10px; border-radius: 5px; overflow-x: auto; }}
-            code {{ font-family: 'Courier New', Courier, monospace; }}
-        </style>
-        """
-        preview.setHtml(css_style + html)
+    def restyle_if_stale(self, container_widget):
+        if getattr(container_widget, 'highlighter_stale', False):
+            container_widget.highlighter_stale = False
+            container_widget.highlighter.set_dark(self.is_dark_theme)
+
+    def apply_preview_stylesheet(self, preview):
+        preview.document().setDefaultStyleSheet(self.preview_stylesheet)
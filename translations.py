@@ -1,310 +1,35 @@
-translations = {
-    "en": {
-        "app_title": "HalwanMark Editor",
-        "untitled_file": "Untitled",
-        "new": "New",
-        "open": "Open",
-        "save": "Save",
-        "save_as": "Save As",
-        "undo": "Undo",
-        "redo": "Redo",
-        "format": "Format",
-        "heading1": "Heading 1",
-        "heading2": "Heading 2",
-        "heading3": "Heading 3",
-        "bold": "Bold",
-        "italic": "Italic",
-        "strikethrough": "Strikethrough",
-        "bullet_list": "Bullet List",
-        "numbered_list": "Numbered List",
-        "task_list": "Task List",
-        "link": "Link",
-        "image": "Image",
-        "inline_code": "Inline Code",
-        "keyboard_key": "Keyboard Key",
-        "code_block": "Code Block",
-        "blockquote": "Blockquote",
-        "horizontal_line": "Horizontal Line",
-        "table": "Table",
-        "text": "Text",
-        "to_uppercase": "To Uppercase",
-        "to_lowercase": "To Lowercase",
-        "export_html": "Export HTML",
-        "toggle_theme": "Toggle Theme",
-        "help": "Help",
-        "language": "Language",
-        "word_count": "Words: {}",
-        "char_count": "Characters: {}",
-        "file_saved": "File saved successfully.",
-        "file_opened": "File loaded successfully.",
-        "save_changes_title": "Save Changes?",
-        "save_changes_message": "Do you want to save your changes to '{}'?",
-        "export_html_file_name": "Export HTML",
-        "html_file_saved": "HTML file saved successfully to: {}",
-        "error": "Error",
-        "no_content_to_export": "No content to export.",
-        "export_error": "Error exporting file: {}",
-        "find_replace_title": "Find and Replace",
-        "find_label": "Find:",
-        "replace_label": "Replace with:",
-        "find_button": "Find Next",
-        "replace_button": "Replace",
-        "replace_all_button": "Replace All",
-        "case_sensitive_checkbox": "Case sensitive",
-        "not_found_message": "'{}' not found.",
-        "replace_count_message": "Replaced {} occurrences of '{}'.",
-        "table_creation_title": "Create Table",
-        "rows_label": "Rows:",
-        "cols_label": "Columns:",
-        "ok_button": "OK",
-        "cancel_button": "Cancel",
-        "invalid_dimensions_message": "Rows and columns must be integers greater than 0.",
-        "table_inserted": "Table with {} rows and {} columns inserted.",
-        "light_theme": "Light theme applied.",
-        "dark_theme": "Dark theme applied.",
-        "help_text": "This is a simple Markdown editor. Type on the right, see the preview on the left. Use the toolbar for formatting.",
-        "language_changed": "Language changed successfully.",
-        "math_formula": "Math Formula",
-        "math_formula_inserted": "Math formula inserted.",
-        "file_new_message": "New file created.",
-        "save_changes_prompt": "Do you want to save your changes before closing?",
-        "yes": "Yes",
-        "no": "No",
-        "cancel": "Cancel",
-        "notes_tag": "Note Tag",
-        "notes_inserted": "Note tag inserted.",
-        "table_header": "Column {}",
-        "table_cell": "Cell ({}, {})",
-    },
-    "ar": {
-        "app_title": "محرر حلوان مارك",
-        "untitled_file": "بدون عنوان",
-        "new": "جديد",
-        "open": "فتح",
-        "save": "حفظ",
-        "save_as": "حفظ باسم",
-        "undo": "تراجع",
-        "redo": "إعادة",
-        "format": "تنسيق",
-        "heading1": "عنوان 1",
-        "heading2": "عنوان 2",
-        "heading3": "عنوان 3",
-        "bold": "خط عريض",
-        "italic": "مائل",
-        "strikethrough": "خط في المنتصف",
-        "bullet_list": "قائمة نقطية",
-        "numbered_list": "قائمة مرقمة",
-        "task_list": "قائمة مهام",
-        "link": "رابط",
-        "image": "صورة",
-        "inline_code": "كود مضمّن",
-        "keyboard_key": "مفتاح لوحة مفاتيح",
-        "code_block": "كتلة كود",
-        "blockquote": "اقتباس",
-        "horizontal_line": "خط أفقي",
-        "table": "جدول",
-        "text": "نص",
-        "to_uppercase": "إلى أحرف كبيرة",
-        "to_lowercase": "إلى أحرف صغيرة",
-        "export_html": "تصدير HTML",
-        "toggle_theme": "تبديل المظهر",
-        "help": "مساعدة",
-        "language": "لغة",
-        "word_count": "الكلمات: {}",
-        "char_count": "الأحرف: {}",
-        "file_saved": "تم حفظ الملف بنجاح.",
-        "file_opened": "تم تحميل الملف بنجاح.",
-        "save_changes_title": "حفظ التغييرات؟",
-        "save_changes_message": "هل تريد حفظ التغييرات على '{}'؟",
-        "export_html_file_name": "تصدير HTML",
-        "html_file_saved": "تم حفظ ملف HTML بنجاح في: {}",
-        "error": "خطأ",
-        "no_content_to_export": "لا يوجد محتوى للتصدير.",
-        "export_error": "خطأ أثناء تصدير الملف: {}",
-        "find_replace_title": "بحث واستبدال",
-        "find_label": "بحث:",
-        "replace_label": "استبدال بـ:",
-        "find_button": "البحث عن التالي",
-        "replace_button": "استبدال",
-        "replace_all_button": "استبدال الكل",
-        "case_sensitive_checkbox": "حساس لحالة الأحرف",
-        "not_found_message": "لم يتم العثور على '{}'.",
-        "replace_count_message": "تم استبدال {} مرة من '{}'.",
-        "table_creation_title": "إنشاء جدول",
-        "rows_label": "الصفوف:",
-        "cols_label": "الأعمدة:",
-        "ok_button": "موافق",
-        "cancel_button": "إلغاء",
-        "invalid_dimensions_message": "يجب أن تكون الصفوف والأعمدة أرقامًا صحيحة أكبر من 0.",
-        "table_inserted": "تم إدراج جدول بـ {} صفوف و {} أعمدة.",
-        "light_theme": "تم تطبيق المظهر الفاتح.",
-        "dark_theme": "تم تطبيق المظهر الداكن.",
-        "help_text": "هذا محرر ماركداون بسيط. اكتب على اليمين وشاهد المعاينة على اليسار. استخدم شريط الأدوات للتنسيق.",
-        "language_changed": "تم تغيير اللغة بنجاح.",
-        "math_formula": "صيغة رياضية",
-        "math_formula_inserted": "تم إدراج صيغة رياضية.",
-        "file_new_message": "تم إنشاء ملف جديد.",
-        "save_changes_prompt": "هل تريد حفظ التغييرات قبل الإغلاق؟",
-        "yes": "نعم",
-        "no": "لا",
-        "cancel": "إلغاء",
-        "notes_tag": "وسم الملاحظات",
-        "notes_inserted": "تم إدراج وسم الملاحظات.",
-        "table_header": "عمود {}",
-        "table_cell": "خلية ({}, {})",
-    },
-    "zh": {
-        "app_title": "HalwanMark编辑器",
-        "untitled_file": "无标题",
-        "new": "新建",
-        "open": "打开",
-        "save": "保存",
-        "save_as": "另存为",
-        "undo": "撤消",
-        "redo": "重做",
-        "format": "格式",
-        "heading1": "标题 1",
-        "heading2": "标题 2",
-        "heading3": "标题 3",
-        "bold": "粗体",
-        "italic": "斜体",
-        "strikethrough": "删除线",
-        "bullet_list": "项目符号列表",
-        "numbered_list": "编号列表",
-        "task_list": "任务列表",
-        "link": "链接",
-        "image": "图片",
-        "inline_code": "内联代码",
-        "keyboard_key": "键盘按键",
-        "code_block": "代码块",
-        "blockquote": "引述",
-        "horizontal_line": "水平线",
-        "table": "表格",
-        "text": "文本",
-        "to_uppercase": "转为大写",
-        "to_lowercase": "转为小写",
-        "export_html": "导出HTML",
-        "toggle_theme": "切换主题",
-        "help": "帮助",
-        "language": "语言",
-        "word_count": "字数: {}",
-        "char_count": "字符数: {}",
-        "file_saved": "文件保存成功。",
-        "file_opened": "文件加载成功。",
-        "save_changes_title": "保存更改？",
-        "save_changes_message": "是否要保存对 '{}' 的更改？",
-        "export_html_file_name": "导出HTML",
-        "html_file_saved": "HTML文件保存成功: {}",
-        "error": "错误",
-        "no_content_to_export": "没有可导出的内容。",
-        "export_error": "导出文件时出错: {}",
-        "find_replace_title": "查找和替换",
-        "find_label": "查找:",
-        "replace_label": "替换为:",
-        "find_button": "查找下一个",
-        "replace_button": "替换",
-        "replace_all_button": "全部替换",
-        "case_sensitive_checkbox": "区分大小写",
-        "not_found_message": "未找到 '{}'。",
-        "replace_count_message": "已替换 {} 处 '{}'。",
-        "table_creation_title": "创建表格",
-        "rows_label": "行:",
-        "cols_label": "列:",
-        "ok_button": "确定",
-        "cancel_button": "取消",
-        "invalid_dimensions_message": "行和列必须是大于0的整数。",
-        "table_inserted": "已插入包含 {} 行和 {} 列的表格。",
-        "light_theme": "已应用浅色主题。",
-        "dark_theme": "已应用深色主题。",
-        "help_text": "这是一个简单的Markdown编辑器。在右侧输入，在左侧预览。使用工具栏进行格式化。",
-        "language_changed": "语言切换成功。",
-        "math_formula": "数学公式",
-        "math_formula_inserted": "已插入数学公式。",
-        "file_new_message": "已创建新文件。",
-        "save_changes_prompt": "关闭前是否要保存更改？",
-        "yes": "是",
-        "no": "否",
-        "cancel": "取消",
-        "notes_tag": "备注标签",
-        "notes_inserted": "已插入备注标签。",
-        "table_header": "列 {}",
-        "table_cell": "单元格 ({}, {})",
-    },
-    "es": {
-        "app_title": "Editor HalwanMark",
-        "untitled_file": "Sin título",
-        "new": "Nuevo",
-        "open": "Abrir",
-        "save": "Guardar",
-        "save_as": "Guardar como",
-        "undo": "Deshacer",
-        "redo": "Rehacer",
-        "format": "Formato",
-        "heading1": "Encabezado 1",
-        "heading2": "Encabezado 2",
-        "heading3": "Encabezado 3",
-        "bold": "Negrita",
-        "italic": "Cursiva",
-        "strikethrough": "Tachado",
-        "bullet_list": "Lista con viñetas",
-        "numbered_list": "Lista numerada",
-        "task_list": "Lista de tareas",
-        "link": "Enlace",
-        "image": "Imagen",
-        "inline_code": "Código en línea",
-        "keyboard_key": "Tecla de teclado",
-        "code_block": "Bloque de código",
-        "blockquote": "Cita",
-        "horizontal_line": "Línea horizontal",
-        "table": "Tabla",
-        "text": "Texto",
-        "to_uppercase": "A mayúsculas",
-        "to_lowercase": "A minúsculas",
-        "export_html": "Exportar a HTML",
-        "toggle_theme": "Cambiar tema",
-        "help": "Ayuda",
-        "language": "Idioma",
-        "word_count": "Palabras: {}",
-        "char_count": "Caracteres: {}",
-        "file_saved": "Archivo guardado exitosamente.",
-        "file_opened": "Archivo cargado exitosamente.",
-        "save_changes_title": "¿Guardar cambios?",
-        "save_changes_message": "¿Quieres guardar los cambios en '{}'?",
-        "export_html_file_name": "Exportar HTML",
-        "html_file_saved": "Archivo HTML guardado exitosamente en: {}",
-        "error": "Error",
-        "no_content_to_export": "No hay contenido para exportar.",
-        "export_error": "Error al exportar archivo: {}",
-        "find_replace_title": "Buscar y reemplazar",
-        "find_label": "Buscar:",
-        "replace_label": "Reemplazar con:",
-        "find_button": "Buscar siguiente",
-        "replace_button": "Reemplazar",
-        "replace_all_button": "Reemplazar todo",
-        "case_sensitive_checkbox": "Distinguir mayúsculas y minúsculas",
-        "not_found_message": "'{}' no encontrado.",
-        "replace_count_message": "Se reemplazaron {} ocurrencias de '{}'.",
-        "table_creation_title": "Crear tabla",
-        "rows_label": "Filas:",
-        "cols_label": "Columnas:",
-        "ok_button": "Aceptar",
-        "cancel_button": "Cancelar",
-        "invalid_dimensions_message": "Las filas y columnas deben ser números enteros mayores que 0.",
-        "table_inserted": "Tabla con {} filas y {} columnas insertada.",
-        "light_theme": "Tema claro aplicado.",
-        "dark_theme": "Tema oscuro aplicado.",
-        "help_text": "Este es un editor de Markdown simple. Escribe a la derecha, ve la vista previa a la izquierda. Usa la barra de herramientas para dar formato.",
-        "language_changed": "Idioma cambiado exitosamente.",
-        "math_formula": "Fórmula matemática",
-        "math_formula_inserted": "Fórmula matemática insertada.",
-        "file_new_message": "Nuevo archivo creado.",
-        "save_changes_prompt": "¿Quieres guardar los cambios antes de cerrar?",
-        "yes": "Sí",
-        "no": "No",
-        "cancel": "Cancelar",
-        "notes_tag": "Etiqueta de Nota",
-        "notes_inserted": "Etiqueta de nota insertada.",
-        "table_header": "Columna {}",
-        "table_cell": "Celda ({}, {})",
-    }
-}
+import json
+import os
+
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "locales")
+LANGUAGES = ("en", "ar", "zh", "es")
+
+
+class Catalogs:
+    # Used as translations[language][key]. Each language is read from
+    # locales/<language>.json the first time it is asked for.
+    def __init__(self, languages):
+        self.languages = languages
+        self.loaded = {}
+
+    def __contains__(self, language):
+        return language in self.languages
+
+    def __iter__(self):
+        return iter(self.languages)
+
+    def __len__(self):
+        return len(self.languages)
+
+    def __getitem__(self, language):
+        catalog = self.loaded.get(language)
+        if catalog is None:
+            if language not in self.languages:
+                raise KeyError(language)
+            with open(os.path.join(LOCALES_DIR, f"{language}.json"), "r", encoding="utf-8") as f:
+                catalog = json.load(f)
+            self.loaded[language] = catalog
+        return catalog
+
+
+translations = Catalogs(LANGUAGES)
@@ -1,5 +1,25 @@
+import os
+import stat
+import tempfile
+
 from translations import translations
 
+# Read once at import: changing the umask to query it is not thread-safe, and
+# atomic_write runs on worker threads.
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def data_home():
+    data_base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(data_base, "hel-markdown")
+
+
+def cache_home():
+    cache_base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_base, "hel-markdown")
+
+
 def generate_markdown_table(rows, cols, current_language):
     if rows <= 0 or cols <= 0:
         return ""
@@ -13,3 +33,70 @@ def generate_markdown_table(rows, cols, current_language):
         data_rows.append(row_content)
 
     return header_row + separator_row + "\n".join(data_rows) + "\n"
+
+
+def utf16_len(text):
+    # Qt positions count UTF-16 code units; characters outside the BMP
+    # (emoji, many CJK extensions) take two.
+    return len(text) + sum(1 for ch in text if ord(ch) > 0xFFFF)
+
+
+def utf16_offsets(text, offsets):
+    # Maps ascending code point offsets into text to UTF-16 positions in a
+    # single pass.
+    positions = []
+    previous = 0
+    position = 0
+    for offset in offsets:
+        position += utf16_len(text[previous:offset])
+        positions.append(position)
+        previous = offset
+    return positions
+
+
+def code_point_offset(text, position):
+    # Inverse of utf16_offsets for a single UTF-16 position.
+    if position <= 0:
+        return 0
+    return len(text.encode("utf-16-le", "surrogatepass")[:2 * position].decode("utf-16-le", "surrogatepass"))
+
+
+def atomic_write(path, text, encoding="utf-8", newline=None):
+    # Write next to the target and rename over it, so a crash or a full disk
+    # leaves either the old file or the new one, never a truncated mix.
+    # text may also be an iterable of strings, written as they come.
+    path = os.path.abspath(path)
+    directory = os.path.dirname(path)
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~UMASK
+
+    fd, temp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding=encoding, newline=newline) as f:
+            if isinstance(text, str):
+                f.write(text)
+            else:
+                f.writelines(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)